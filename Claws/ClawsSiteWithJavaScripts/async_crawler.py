@@ -0,0 +1,540 @@
+"""
+asyncio 爬虫核心：抓取 → 解析 → 筛选 → 下载 四个阶段，之间用有界队列连接。
+
+下游处理不过来时队列写满，上游自动等待（背压），内存不会随发现的链接无限增长。
+列表页使用 aiohttp；下载复用可断点续传的 download_file，在线程池中执行。
+后缀无法判断类型的候选链接不单独探测，由下载时的HEAD请求（同样遵守 robots.txt 和礼貌延迟）确认类型。
+"""
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import CrawlerConfig
+from crawl_state import CrawlState, conditional_headers
+from downloader import (SEGMENT_COUNT, DownloadCancelled, DownloadError, DownloadResult, UnwantedFileType,
+                        cleanup_temp_files, download_file)
+from listing import ListingEntry, announced_before, page_size, page_url, parse_listing
+from metadata import MetadataWriter, entry_record, file_fields
+from metrics import Metrics, report_progress
+from static_fetch import file_type_from_suffix, is_download_candidate, parse_container_links
+from text_index import EXTRACTORS, TextIndex, extract_file, make_pool
+
+NETWORK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+# 值得重试的错误：连接断开、超时、响应体不完整（4xx 等 ClientResponseError 不在其中）
+TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+RETRY_STATUSES = {429, 500, 502, 503, 504}  # 值得重试的HTTP状态码
+
+
+def transient_download_error(e: Exception) -> bool:
+    """下载时的连接错误、超时、可重试的状态码和未下载完整的文件值得重试，其他HTTP错误立即失败"""
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in RETRY_STATUSES
+    if isinstance(e, DownloadCancelled):
+        return False
+    return isinstance(e, (requests.ConnectionError, requests.Timeout,
+                          requests.exceptions.ChunkedEncodingError, DownloadError))
+
+
+def origin(url: str) -> str:
+    parts = urlparse(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class RobotsCache:
+    """按站点缓存 robots.txt"""
+
+    def __init__(self, http: aiohttp.ClientSession, user_agent: str, metrics: Metrics):
+        self.http = http
+        self.user_agent = user_agent
+        self.metrics = metrics
+        self.parsers: dict[str, RobotFileParser] = {}
+        self.locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def parser(self, url: str) -> RobotFileParser:
+        host = origin(url)
+        async with self.locks[host]:
+            if host not in self.parsers:
+                rp = RobotFileParser(f"{host}/robots.txt")
+                try:
+                    with self.metrics.timer("robots", urlparse(url).netloc):
+                        async with self.http.get(rp.url) as response:
+                            if response.status in (401, 403):
+                                rp.disallow_all = True
+                            elif response.status >= 400:
+                                rp.allow_all = True
+                            else:
+                                rp.parse((await response.text()).splitlines())
+                except NETWORK_ERRORS as e:
+                    # 与原来的同步实现一致：读不到 robots.txt 时不爬取
+                    print(f"无法读取 robots.txt: {e}")
+                    rp.disallow_all = True
+                self.parsers[host] = rp
+        return self.parsers[host]
+
+    async def allowed(self, url: str) -> bool:
+        if (await self.parser(url)).can_fetch(self.user_agent, url):
+            return True
+        print(f"robots.txt 禁止爬取: {url}")
+        self.metrics.count("robots_blocked")
+        return False
+
+    async def crawl_delay(self, url: str) -> float:
+        return float((await self.parser(url)).crawl_delay(self.user_agent) or 0)
+
+
+class HostLimiter:
+    """每个站点的并发上限和请求间隔（礼貌延迟）"""
+
+    def __init__(self, per_host: int, delay: float, robots: RobotsCache, metrics: Metrics):
+        self.per_host = per_host
+        self.delay = delay
+        self.robots = robots
+        self.metrics = metrics
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+        self.locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.next_time: defaultdict[str, float] = defaultdict(float)
+
+    @asynccontextmanager
+    async def slot(self, url: str, polite: bool = True):
+        """占用站点的一个并发名额；polite=True 时还要与上一次请求间隔 delay 秒"""
+        host = urlparse(url).netloc
+        semaphore = self.semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with semaphore:
+            if polite:
+                delay = max(self.delay, await self.robots.crawl_delay(url))
+                loop = asyncio.get_running_loop()
+                async with self.locks[host]:
+                    wait = self.next_time[host] - loop.time()
+                    if wait > 0:
+                        self.metrics.observe("politeness_wait", wait)
+                        await asyncio.sleep(wait)
+                    self.next_time[host] = loop.time() + delay
+            yield
+
+
+@dataclass
+class QueryProgress:
+    """一个查询的翻页进度；全部翻完、且新条目都处理完（元数据已写出）后才写入爬取状态"""
+    query_url: str
+    seen: set[str]
+    announced_cursor: str | None  # 早于该月份公布的条目上次已处理过
+    size: int
+    new_ids: list[str] = field(default_factory=list)  # 从新到旧
+    newest_announced: str | None = None
+    responses: dict[str, dict] = field(default_factory=dict)
+    finished: bool = False  # 翻页成功结束
+    static: bool = False  # 已有列表页不用浏览器就能解析
+    done: set[str] = field(default_factory=set)  # 元数据已写出的条目
+
+
+@dataclass
+class PageTask:
+    progress: QueryProgress
+    page: int
+
+    @property
+    def url(self) -> str:
+        return page_url(self.progress.query_url, self.page * self.progress.size)
+
+
+@dataclass
+class DownloadTask:
+    url: str
+    entry: ListingEntry | None = None  # 需要写出元数据的条目（重试的旧链接没有）
+    query_url: str | None = None
+
+
+class AsyncCrawler:
+    """由配置驱动的异步爬虫"""
+
+    def __init__(self, config: CrawlerConfig):
+        self.config = config
+        self.state = CrawlState(config.state_file)
+        self.writer = MetadataWriter(config.metadata_jsonl, config.metadata_parquet)
+        self.metrics = Metrics()
+        self.page_queue: asyncio.Queue[PageTask] = asyncio.Queue()  # 每个查询最多一个待抓取页，无需限制
+        self.parse_queue: asyncio.Queue[tuple[PageTask, str | None, str]] = asyncio.Queue(config.queue_size)
+        self.filter_queue: asyncio.Queue[tuple[str, ListingEntry]] = asyncio.Queue(config.queue_size)
+        self.download_queue: asyncio.Queue[DownloadTask] = asyncio.Queue(config.queue_size)
+        for name in ("page", "parse", "filter", "download"):
+            self.metrics.watch_queue(name, getattr(self, f"{name}_queue"))
+        self.queries: dict[str, QueryProgress] = {}
+        self.active_queries = 0
+        self.queries_done = asyncio.Event()
+        # 本次运行中每个文件只下载一次，多个条目或查询指向同一文件时共享结果
+        self.downloads: dict[str, asyncio.Task] = {}
+        self.executor = ThreadPoolExecutor(max_workers=config.download_workers)
+        self.stop = threading.Event()  # 运行结束或被中断时通知下载线程保存进度后退出
+        # 下载完成的文件交给进程池提取文本，写入全文索引（只在事件循环线程中写入）
+        self.index = TextIndex(config.index_file) if config.index_file else None
+        if self.index is not None and "pdf" in config.file_extensions and "pdf" not in EXTRACTORS:
+            print("未安装 pypdf，pdf 文件不会建立全文索引")
+        self.extract_pool = None
+        self.extractions: dict[str, asyncio.Task] = {}
+        self.pool = None
+        self.pool_lock = asyncio.Lock()
+
+        # 下载线程共用的 requests 会话；分段下载时每个文件同时占用 SEGMENT_COUNT 个连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=config.per_host_connections * 4,
+                              pool_maxsize=config.download_workers * SEGMENT_COUNT)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = config.user_agent
+
+    async def retry(self, url: str, attempt: int, reason) -> None:
+        """记录一次重试并按指数退避等待"""
+        self.metrics.count("retries")
+        wait = self.config.retry_backoff * 2 ** attempt
+        print(f"请求失败，{wait:.1f} 秒后重试（第 {attempt + 1} 次）: {url} - {reason}")
+        await asyncio.sleep(wait)
+
+    # ---------- 抓取 ----------
+
+    async def fetch_worker(self) -> None:
+        while True:
+            task = await self.page_queue.get()
+            try:
+                html, base_url = await self.fetch_page(task)
+                await self.parse_queue.put((task, html, base_url))
+            except Exception as e:
+                print(f"获取列表页失败: {task.url} - {e}")
+                self.metrics.count("errors")
+                self.finish_query(task.progress, committed=False)
+            finally:
+                self.page_queue.task_done()
+
+    async def fetch_page(self, task: PageTask) -> tuple[str | None, str]:
+        """返回页面HTML；页面自上次以来未变化（304）时返回 None"""
+        url = task.url
+        if not await self.robots.allowed(url):
+            return None, url
+        headers = conditional_headers(self.state.validators(task.progress.query_url, url))
+        host = urlparse(url).netloc
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                async with self.limiter.slot(url):
+                    with self.metrics.timer("fetch", host):
+                        async with self.http.get(url, headers=headers) as response:
+                            if response.status in RETRY_STATUSES and attempt < self.config.max_retries:
+                                reason = f"HTTP {response.status}"
+                            else:
+                                html = await self.read_page(task, response)
+                                break
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.config.max_retries:
+                    raise
+                reason = e
+            await self.retry(url, attempt, reason)
+        if html is None:
+            return None, url
+        base_url = str(response.url)
+        if parse_container_links(html, base_url) is not None:
+            task.progress.static = True
+        elif task.progress.static:
+            # 前面的页面不需要渲染：这一页没有条目只是翻到了列表末尾
+            return html, base_url
+        else:
+            print(f"页面需要JavaScript，使用浏览器渲染: {url}")
+            # 静态HTML只是页面框架，结果变化时它未必变化：不保存其校验信息，下次也不发条件请求
+            task.progress.responses.pop(url, None)
+            self.state.clear_validators(task.progress.query_url, url)
+            with self.metrics.timer("render"):
+                html = await self.render(url)
+        return html, base_url
+
+    async def read_page(self, task: PageTask, response: aiohttp.ClientResponse) -> str | None:
+        self.metrics.count("pages")
+        if response.status == 304:
+            print(f"列表页未变化: {task.url}")
+            self.metrics.count("not_modified")
+            return None
+        response.raise_for_status()
+        html = await response.text()
+        self.metrics.count("page_bytes", len(html))
+        task.progress.responses[task.url] = response.headers
+        return html
+
+    async def render(self, url: str) -> str:
+        """在线程中用无头浏览器池渲染页面（首次需要时才启动浏览器），失败时抛出异常"""
+        # 只有遇到需要JavaScript的页面时才导入 selenium
+        from driver_pool import DriverPool, get_page_source, render_pages, setup_driver
+
+        async with self.pool_lock:
+            if self.pool is None:
+                factory = partial(setup_driver, self.config.download_dir, self.config.chromedriver_path,
+                                  headless=True, block_resources=self.config.block_resources)
+                self.pool = await asyncio.to_thread(DriverPool, factory, self.config.pool_size)
+        async with self.limiter.slot(url):
+            pages = await asyncio.to_thread(render_pages, self.pool, [url], get_page_source)
+        # 渲染失败不能当作空页面，否则这次查询会被当作已完成提交
+        if not pages.get(url):
+            raise RuntimeError("浏览器渲染失败")
+        return pages[url]
+
+    # ---------- 解析 ----------
+
+    async def parse_worker(self) -> None:
+        while True:
+            task, html, base_url = await self.parse_queue.get()
+            try:
+                await self.parse_page(task, html, base_url)
+            except Exception as e:
+                print(f"解析列表页失败: {task.url} - {e}")
+                self.metrics.count("errors")
+                self.finish_query(task.progress, committed=False)
+            finally:
+                self.parse_queue.task_done()
+
+    async def parse_page(self, task: PageTask, html: str | None, base_url: str) -> None:
+        progress = task.progress
+        with self.metrics.timer("parse"):
+            entries = parse_listing(html, base_url) if html else []
+        new_entries = []
+        for entry in entries:
+            if entry.entry_id in progress.seen or announced_before(entry.announced, progress.announced_cursor):
+                break  # 之后都是上次已经处理过的条目（已见编号只保留最近的，月份游标兜底）
+            new_entries.append(entry)
+        self.metrics.count("entries", len(new_entries))
+        if new_entries:
+            progress.newest_announced = progress.newest_announced or new_entries[0].announced
+            progress.new_ids.extend(entry.entry_id for entry in new_entries)
+        for entry in new_entries:
+            await self.filter_queue.put((progress.query_url, entry))
+
+        has_more = entries and len(new_entries) == len(entries) and len(entries) >= progress.size
+        if has_more and task.page + 1 < self.config.max_pages:
+            self.page_queue.put_nowait(PageTask(progress, task.page + 1))
+        else:
+            self.finish_query(progress, committed=True)
+
+    def finish_query(self, progress: QueryProgress, committed: bool) -> None:
+        """查询翻页结束；只有成功翻完的查询在运行结束时更新已见条目（见 commit_queries）"""
+        if committed:
+            print(f"{progress.query_url}: 发现 {len(progress.new_ids)} 个新条目")
+            progress.finished = True
+        self.active_queries -= 1
+        if self.active_queries == 0:
+            self.queries_done.set()
+
+    def commit_queries(self) -> None:
+        """把已处理完的新条目记为已见；运行被中断时，未处理完的条目下次重新处理"""
+        for progress in self.queries.values():
+            if not progress.finished:
+                continue
+            # 下次运行遇到第一个已见条目就停止翻页，所以只能记录最旧的一段连续处理完的条目
+            start = len(progress.new_ids)
+            while start and progress.new_ids[start - 1] in progress.done:
+                start -= 1
+            complete = start == 0
+            self.state.mark_seen(progress.query_url, progress.new_ids[start:],
+                                 progress.newest_announced if complete else None)
+            if complete:
+                for url, headers in progress.responses.items():
+                    self.state.set_validators(progress.query_url, url, headers)
+            else:
+                print(f"{progress.query_url}: {start} 个新条目尚未处理完，下次运行重新处理")
+
+    # ---------- 筛选 ----------
+
+    async def filter_worker(self) -> None:
+        while True:
+            query_url, entry = await self.filter_queue.get()
+            try:
+                with self.metrics.timer("filter"):
+                    file_links = [link for link in entry.links if self.is_file_link(link)]
+                if not file_links:
+                    self.writer.write(entry_record(entry, None, None, query_url))
+                    self.queries[query_url].done.add(entry.entry_id)
+                for i, link in enumerate(file_links):
+                    self.state.add_pending(link)
+                    # 元数据记录与条目的第一个文件关联
+                    await self.download_queue.put(DownloadTask(link, entry if i == 0 else None, query_url))
+            except Exception as e:
+                print(f"筛选文件链接失败: {entry.entry_id} - {e}")
+                self.metrics.count("errors")
+            finally:
+                self.filter_queue.task_done()
+
+    def is_file_link(self, url: str) -> bool:
+        """路径后缀是要下载的类型，或后缀无法判断但像下载地址（类型在下载时按 Content-Type 确认）"""
+        if urlparse(url).scheme not in ("http", "https"):
+            return False
+        decided, ext = file_type_from_suffix(url, self.config.file_extensions)
+        if decided:
+            return ext is not None
+        return is_download_candidate(url, self.config.file_extensions)
+
+    # ---------- 下载 ----------
+
+    async def download_worker(self) -> None:
+        while True:
+            task = await self.download_queue.get()
+            try:
+                result = await self.download(task.url)
+                if task.entry is not None:
+                    record = entry_record(task.entry, task.url, result, task.query_url)
+                    if result is None and task.url in self.state.pending():
+                        # 下载失败：记录随待下载链接保存在爬取状态中，重试成功后再写出
+                        self.state.defer_record(task.url, record)
+                    else:
+                        self.writer.write(record)
+                    self.queries[task.query_url].done.add(task.entry.entry_id)
+            except Exception as e:
+                print(f"处理下载结果失败: {task.url} - {e}")
+            finally:
+                self.download_queue.task_done()
+
+    async def download(self, url: str) -> DownloadResult | None:
+        if url not in self.downloads:
+            self.downloads[url] = asyncio.create_task(self.download_once(url))
+        result = await asyncio.shield(self.downloads[url])
+        if result is not None:
+            # 记录文件并移出待下载列表（同一文件可能被多个条目重新加入）
+            self.state.set_file(url, result.record())
+            self.schedule_extraction(result)
+            for record in self.state.pop_records(url):
+                self.writer.write({**record, **file_fields(result)})
+        return result
+
+    async def download_once(self, url: str) -> DownloadResult | None:
+        if not await self.robots.allowed(url):
+            self.state.remove_pending(url)
+            return None
+        loop = asyncio.get_running_loop()
+        host = urlparse(url).netloc
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                async with self.limiter.slot(url):
+                    with self.metrics.timer("download", host):
+                        result = await loop.run_in_executor(self.executor, partial(
+                            download_file, url, self.config.download_dir, known=self.state.file(url),
+                            extensions=self.config.file_extensions, session=self.session,
+                            owner=self.state.file_owner, stop=self.stop))
+                break
+            except UnwantedFileType as e:
+                # 候选链接其实不是文件，不再重试
+                if self.config.verbose:
+                    print(f"跳过: {url} - {e}")
+                self.metrics.count("not_files")
+                self.state.remove_pending(url)
+                return None
+            except Exception as e:
+                # 已下载的部分保存在 .part 文件中，重试时会续传
+                if attempt == self.config.max_retries or not transient_download_error(e):
+                    print(f"下载失败: {url} - {e}")
+                    self.metrics.count("errors")
+                    return None
+                await self.retry(url, attempt, e)
+        if result.skipped:
+            self.metrics.count("files_skipped")
+            if self.config.verbose:
+                print(f"文件未变化，跳过下载: {os.path.basename(result.path)}")
+        else:
+            self.metrics.count("files")
+            self.metrics.count("bytes", result.size)
+            if self.config.verbose:
+                print(f"下载成功: {os.path.basename(result.path)} ({result.size} 字节)")
+        return result
+
+    # ---------- 文本提取与索引 ----------
+
+    def schedule_extraction(self, result: DownloadResult) -> None:
+        """新内容（按摘要判断）提交给提取进程池，不阻塞下载"""
+        ext = os.path.splitext(result.path)[1].lstrip(".").lower()
+        if self.index is None or ext not in EXTRACTORS or result.sha256 in self.extractions:
+            return
+        if self.index.processed(result.sha256):
+            return
+        if self.extract_pool is None:
+            self.extract_pool = make_pool(self.config.index_workers)
+        self.extractions[result.sha256] = asyncio.create_task(self.extract(result))
+
+    async def extract(self, result: DownloadResult) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            with self.metrics.timer("extract"):
+                record = await loop.run_in_executor(self.extract_pool, extract_file, result.path, result.sha256)
+        except Exception as e:
+            print(f"提取文本失败: {result.path} - {e}")
+            self.metrics.count("index_errors")
+            return
+        if record["error"]:
+            # 记录失败原因，同一内容不再重复提取
+            print(f"提取文本失败: {result.path} - {record['error']}")
+            self.metrics.count("index_errors")
+        self.index.add(record)
+        self.metrics.count("indexed")
+        self.metrics.count("indexed_chars", len(record["text"]))
+
+    # ---------- 运行 ----------
+
+    async def run(self) -> None:
+        config = self.config
+        os.makedirs(config.download_dir, exist_ok=True)
+        connector = aiohttp.TCPConnector(limit=config.max_connections, limit_per_host=config.per_host_connections)
+        timeout = aiohttp.ClientTimeout(total=config.request_timeout)
+        workers: list[asyncio.Task] = []
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers={"User-Agent": config.user_agent}) as self.http:
+                self.robots = RobotsCache(self.http, config.user_agent, self.metrics)
+                self.limiter = HostLimiter(config.per_host_connections, config.delay, self.robots, self.metrics)
+                if config.progress_interval > 0:
+                    workers.append(asyncio.create_task(report_progress(self.metrics, config.progress_interval)))
+                workers += [asyncio.create_task(self.fetch_worker()) for _ in range(config.fetch_workers)]
+                workers.append(asyncio.create_task(self.parse_worker()))
+                # 筛选只看路径，不发请求，一个协程就够了
+                workers.append(asyncio.create_task(self.filter_worker()))
+                workers += [asyncio.create_task(self.download_worker()) for _ in range(config.download_workers)]
+
+                # 先重试上次未下载成功的文件
+                for url in list(self.state.pending()):
+                    await self.download_queue.put(DownloadTask(url))
+                # 每个查询从第一页开始
+                self.active_queries = len(config.queries)
+                for query_url in config.queries:
+                    progress = QueryProgress(query_url, self.state.seen(query_url),
+                                             self.state.newest_announced(query_url), page_size(query_url))
+                    self.queries[query_url] = progress
+                    self.page_queue.put_nowait(PageTask(progress, 0))
+                if config.queries:
+                    await self.queries_done.wait()
+                # 查询都翻完后，等待已发现的条目全部筛选、下载完
+                await self.filter_queue.join()
+                await self.download_queue.join()
+                await asyncio.gather(*self.extractions.values())
+        finally:
+            self.stop.set()
+            tasks = workers + list(self.downloads.values()) + list(self.extractions.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.writer.close()
+            print(f"已写出 {self.writer.written} 条元数据")
+            print(self.metrics.progress_line())
+            if config.metrics_file:
+                self.metrics.dump(config.metrics_file)
+            self.commit_queries()
+            self.state.save()
+            cleanup_temp_files(config.download_dir)
+            if self.pool is not None:
+                await asyncio.to_thread(self.pool.close)
+            # 正在下载的线程在下一块数据后保存进度并退出，等它们结束再关闭会话
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.session.close()
+            if self.extract_pool is not None:
+                self.extract_pool.shutdown(wait=False, cancel_futures=True)
+            if self.index is not None:
+                self.index.close()
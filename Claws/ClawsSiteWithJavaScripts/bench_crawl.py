@@ -0,0 +1,74 @@
+"""
+爬虫吞吐量基准测试：在本地测试站点上完整运行一次爬取（无礼貌延迟），输出吞吐量和各阶段指标。
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+import fixture_site
+from async_crawler import AsyncCrawler
+from config import CrawlerConfig
+
+
+def bench(base_url: str, work_dir: str, download_workers: int, pages: int) -> dict:
+    """返回一次完整爬取的指标快照"""
+    config = CrawlerConfig(
+        queries=[f"{base_url}/search/physics?query=bench&size={fixture_site.PAGE_SIZE}"],
+        download_dir=os.path.join(work_dir, "downloads"),
+        state_file=os.path.join(work_dir, "crawl_state.json"),
+        metadata_jsonl=os.path.join(work_dir, "records.jsonl"),
+        metadata_parquet=None,
+        metrics_file=None,
+        index_file=None,  # 只测爬取和下载；测试站点的文件不需要索引
+        delay=0,
+        max_pages=pages,
+        per_host_connections=download_workers,
+        download_workers=download_workers,
+        progress_interval=0,
+    )
+    crawler = AsyncCrawler(config)
+    asyncio.run(crawler.run())
+    return crawler.metrics.snapshot()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="爬虫吞吐量基准测试（离线、可重复）")
+    parser.add_argument("--entries", type=int, default=1000, help="测试站点的条目总数")
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="每个文件的大小（字节）")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="列表页的模拟延迟（秒）")
+    parser.add_argument("--file-latency", type=float, default=0.02, help="文件请求的模拟延迟（秒）")
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=[1, 4, 16, 32],
+                        help="逗号分隔的下载并发数")
+    parser.add_argument("--output", help="把每次运行的完整指标写入该 JSON 文件")
+    args = parser.parse_args()
+
+    fixture_site.TOTAL_ENTRIES = args.entries
+    fixture_site.FILE_SIZE = args.file_size
+    fixture_site.PAGE_LATENCY = args.page_latency
+    fixture_site.FILE_LATENCY = args.file_latency
+    pages = -(-args.entries // fixture_site.PAGE_SIZE)
+
+    server, base_url = fixture_site.start_fixture_site()
+    results = {}
+    try:
+        print(f"{'并发':>6} {'耗时(s)':>8} {'页面/s':>8} {'文件/s':>8} {'MB/s':>8} {'下载p50(s)':>10} {'下载p99(s)':>10}")
+        for workers in args.workers:
+            # 每次都从空目录开始，保证结果可重复
+            with tempfile.TemporaryDirectory() as work_dir:
+                snapshot = bench(base_url, work_dir, workers, pages)
+            results[workers] = snapshot
+            download = snapshot["stages"].get("download", {})
+            print(f"{workers:>6} {snapshot['elapsed_s']:>8.2f} {snapshot['rates']['pages_per_s']:>8.2f} "
+                  f"{snapshot['rates']['files_per_s']:>8.1f} {snapshot['rates']['bytes_per_s'] / 1024 / 1024:>8.2f} "
+                  f"{download.get('p50_s', 0):>10.4f} {download.get('p99_s', 0):>10.4f}")
+    finally:
+        server.shutdown()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+浏览器池基准测试：在本地测试站点上统计不同池大小下每分钟渲染的页面数。
+
+只计渲染和取页面源码，不做文件类型探测（探测结果有缓存，会让后测的池大小占便宜）。
+"""
+import argparse
+import time
+from functools import partial
+
+from config import CrawlerConfig
+from driver_pool import DriverPool, get_page_source, render_pages, setup_driver
+from fixture_site import PAGE_SIZE, TOTAL_ENTRIES, start_fixture_site
+
+
+def bench(base_url: str, pool_size: int, pages: int, block_resources: bool) -> float:
+    """返回指定池大小下的 页面/分钟"""
+    urls = [f"{base_url}/search/physics?query=123&js=1&size={PAGE_SIZE}&start={(i * PAGE_SIZE) % TOTAL_ENTRIES}"
+            f"&n={i}" for i in range(pages)]
+    # 启动时间不计入吞吐量
+    config = CrawlerConfig()
+    pool = DriverPool(partial(setup_driver, config.download_dir, config.chromedriver_path,
+                              headless=True, block_resources=block_resources), size=pool_size)
+    try:
+        started = time.perf_counter()
+        results = render_pages(pool, urls, get_page_source)
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.close()
+    return len(results) / elapsed * 60
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="浏览器池吞吐量基准测试")
+    parser.add_argument("--pages", type=int, default=40, help="每个池大小渲染的页面数")
+    parser.add_argument("--min-size", type=int, default=1)
+    parser.add_argument("--max-size", type=int, default=8)
+    parser.add_argument("--no-block", action="store_true", help="不屏蔽图片、字体和CSS")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_site()
+    try:
+        print(f"{'池大小':>6} {'页面/分钟':>10}")
+        for size in range(args.min_size, args.max_size + 1):
+            rate = bench(base_url, size, args.pages, block_resources=not args.no_block)
+            print(f"{size:>6} {rate:>10.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
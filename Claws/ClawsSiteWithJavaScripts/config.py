@@ -0,0 +1,101 @@
+"""
+爬虫配置：默认值、配置文件（JSON / TOML）和命令行参数。
+"""
+import argparse
+import json
+from dataclasses import dataclass, field, fields
+
+
+@dataclass
+class CrawlerConfig:
+    # 要爬取的列表页（可以有多个查询）
+    queries: list[str] = field(default_factory=lambda: [
+        "https://arxiv.org/search/physics?query=123&searchtype=all&abstracts=show&order=-announced_date_first&size=50",
+    ])
+    download_dir: str = "./downloads"  # 下载目录
+    state_file: str = "./crawl_state.json"  # 增量爬取状态（已见条目、ETag等）
+    metadata_jsonl: str = "./metadata/records.jsonl"  # 论文元数据输出
+    metadata_parquet: str | None = "./metadata/records.parquet"  # 列式输出（需要 pyarrow，设为 null 关闭）
+    file_extensions: list[str] = field(default_factory=lambda: ["pdf", "docx", "xlsx"])  # 支持的文件类型
+    user_agent: str = "Mozilla/5.0 (compatible; ClawsCrawler/1.0)"
+    delay: float = 15  # 同一站点两次请求之间的间隔（秒），robots.txt 的 Crawl-delay 更大时以其为准
+    max_pages: int = 20  # 每个查询每次最多翻页数
+    # 并发与队列
+    max_connections: int = 1000  # 全局最大连接数
+    per_host_connections: int = 4  # 每个站点最大并发连接数
+    fetch_workers: int = 64  # 列表页抓取协程数
+    download_workers: int = 32  # 下载线程数
+    queue_size: int = 1000  # 各阶段之间队列的容量（满时上游等待，防止内存增长）
+    request_timeout: float = 30  # 请求超时时间（秒）
+    max_retries: int = 3  # 网络错误或 5xx/429 时的重试次数
+    retry_backoff: float = 1.0  # 第 n 次重试前等待 retry_backoff * 2^(n-1) 秒
+    # 进度与指标
+    progress_interval: float = 5  # 打印进度的间隔（秒），0 表示不打印
+    metrics_file: str | None = "./metrics.json"  # 运行结束时写出的指标（设为 null 关闭）
+    verbose: bool = False  # 逐个打印下载结果
+    # 下载后处理
+    index_file: str | None = "./metadata/text_index.sqlite"  # 全文索引（设为 null 关闭）
+    index_workers: int = 0  # 文本提取进程数，0 表示使用全部 CPU 核心
+    # 浏览器（仅在页面需要 JavaScript 时使用）
+    chromedriver_path: str = "chromedriver.exe"  # 你的chromedriver完整路径
+    pool_size: int = 2  # 无头浏览器池大小
+    block_resources: bool = True  # 渲染时屏蔽图片、字体和CSS以加快加载
+
+
+def load_config(path: str) -> CrawlerConfig:
+    """从 JSON 或 TOML 文件读取配置，未设置的项使用默认值"""
+    if path.endswith(".toml"):
+        # 只有读取 TOML 配置时才导入 tomllib（Python 3.11 起提供），JSON 配置在 3.10 上也能用
+        import tomllib
+
+        with open(path, "rb") as f:
+            values = tomllib.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            values = json.load(f)
+    known = {f.name for f in fields(CrawlerConfig)}
+    unknown = set(values) - known
+    if unknown:
+        raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+    return CrawlerConfig(**values)
+
+
+def parse_args(argv: list[str] | None = None) -> CrawlerConfig:
+    """解析命令行参数；命令行中给出的值覆盖配置文件"""
+    parser = argparse.ArgumentParser(description="爬取论文、专利等文件")
+    parser.add_argument("-c", "--config", help="配置文件（.json 或 .toml）")
+    parser.add_argument("-q", "--query", dest="queries", action="append", help="要爬取的列表页，可重复")
+    parser.add_argument("--download-dir")
+    parser.add_argument("--state-file")
+    parser.add_argument("--metadata-jsonl")
+    parser.add_argument("--metadata-parquet")
+    parser.add_argument("--no-parquet", action="store_true", help="不输出 Parquet")
+    parser.add_argument("--file-extensions", type=lambda s: s.split(","), help="逗号分隔，例如 pdf,docx")
+    parser.add_argument("--delay", type=float)
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--max-connections", type=int)
+    parser.add_argument("--per-host-connections", type=int)
+    parser.add_argument("--fetch-workers", type=int)
+    parser.add_argument("--download-workers", type=int)
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--max-retries", type=int)
+    parser.add_argument("--progress-interval", type=float)
+    parser.add_argument("--metrics-file")
+    parser.add_argument("-v", "--verbose", action="store_true", default=None, help="逐个打印下载结果")
+    parser.add_argument("--index-file")
+    parser.add_argument("--no-index", action="store_true", help="下载后不提取文本、不建立全文索引")
+    parser.add_argument("--index-workers", type=int)
+    parser.add_argument("--chromedriver-path")
+    parser.add_argument("--pool-size", type=int)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else CrawlerConfig()
+    for f in fields(CrawlerConfig):
+        value = getattr(args, f.name, None)
+        if value is not None:
+            setattr(config, f.name, value)
+    if args.no_parquet:
+        config.metadata_parquet = None
+    if args.no_index:
+        config.index_file = None
+    return config
@@ -0,0 +1,106 @@
+"""
+增量爬取状态：记录每个查询已见过的条目和列表页、文件的 ETag / Last-Modified。
+"""
+import json
+import os
+
+from listing import announced_before, page_url
+
+MAX_SEEN_IDS = 1000  # 每个查询最多记录的已见条目数
+
+
+class CrawlState:
+    """保存在 JSON 文件中的爬取游标"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"queries": {}, "files": {}, "pending": [], "records": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.data.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"读取爬取状态失败，重新开始: {e}")
+        # 本地文件路径 -> 链接，用于判断已存在的文件属于哪个链接
+        self.owners = {record["path"]: url for url, record in self.data["files"].items()}
+
+    def query(self, query_url: str) -> dict:
+        """某个查询（忽略分页参数）的状态"""
+        key = page_url(query_url, 0)
+        return self.data["queries"].setdefault(key, {"seen_ids": [], "newest_announced": None, "pages": {}})
+
+    def seen(self, query_url: str) -> set[str]:
+        return set(self.query(query_url)["seen_ids"])
+
+    def newest_announced(self, query_url: str) -> str | None:
+        """上次处理完的最新公布月份；列表按公布日期倒序，更早月份的条目都已处理过"""
+        return self.query(query_url)["newest_announced"]
+
+    def mark_seen(self, query_url: str, entry_ids: list[str], newest_announced: str | None) -> None:
+        """记录新见到的条目（按新到旧的顺序），保留最近 MAX_SEEN_IDS 个，并推进公布月份游标"""
+        query = self.query(query_url)
+        ids = list(dict.fromkeys(entry_ids + query["seen_ids"]))
+        query["seen_ids"] = ids[:MAX_SEEN_IDS]
+        if newest_announced and not announced_before(newest_announced, query["newest_announced"]):
+            query["newest_announced"] = newest_announced
+
+    def validators(self, query_url: str, url: str) -> dict:
+        """列表页的缓存校验信息"""
+        return self.query(query_url)["pages"].get(url, {})
+
+    def set_validators(self, query_url: str, url: str, headers) -> None:
+        self.query(query_url)["pages"][url] = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+
+    def clear_validators(self, query_url: str, url: str) -> None:
+        self.query(query_url)["pages"].pop(url, None)
+
+    def file(self, url: str) -> dict | None:
+        return self.data["files"].get(url)
+
+    def set_file(self, url: str, record: dict) -> None:
+        self.data["files"][url] = record
+        self.owners[record["path"]] = url
+        if url in self.data["pending"]:
+            self.data["pending"].remove(url)
+
+    def file_owner(self, path: str) -> str | None:
+        return self.owners.get(path)
+
+    def pending(self) -> list[str]:
+        """上次发现但尚未下载成功的文件链接"""
+        return self.data["pending"]
+
+    def add_pending(self, url: str) -> None:
+        if url not in self.data["pending"]:
+            self.data["pending"].append(url)
+
+    def remove_pending(self, url: str) -> None:
+        if url in self.data["pending"]:
+            self.data["pending"].remove(url)
+
+    def defer_record(self, url: str, record: dict) -> None:
+        """文件下载失败时暂存条目记录，等重试成功后再写出"""
+        self.data["records"].setdefault(url, []).append(record)
+
+    def pop_records(self, url: str) -> list[dict]:
+        return self.data["records"].pop(url, [])
+
+    def save(self) -> None:
+        """原子写入状态文件"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def conditional_headers(validators: dict) -> dict:
+    """根据记录的 ETag / Last-Modified 生成条件请求头"""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
@@ -0,0 +1,342 @@
+"""
+可断点续传的HTTP下载：写入 .part 临时文件并记录偏移量，用 Range/If-Range 续传，
+大文件可按字节区间并行下载，校验长度和哈希后原子移动到下载目录。
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable
+from dataclasses import dataclass
+from email.message import Message
+from pathlib import PurePosixPath
+from urllib.parse import unquote, urlparse
+
+import requests
+
+from crawl_state import conditional_headers
+from static_fetch import REQUEST_TIMEOUT, content_type_extension, file_type_from_suffix, session
+
+PART_SUFFIX = ".part"  # 未完成的下载文件
+META_SUFFIX = ".part.json"  # 记录续传偏移量和校验信息
+CHUNK_SIZE = 1024 * 1024  # 每次写入的块大小
+SAVE_EVERY = 8 * CHUNK_SIZE  # 每写入多少字节保存一次进度
+SEGMENT_THRESHOLD = 64 * 1024 * 1024  # 超过该大小的文件按区间并行下载
+SEGMENT_COUNT = 4  # 并行区间数
+# 不接受压缩传输：Range / Content-Range / Content-Length 都按文件本身的字节计算，与 .part 文件一致
+IDENTITY = {"Accept-Encoding": "identity"}
+
+# 本进程中各本地路径属于哪个链接，防止同名文件互相覆盖或共用 .part 文件
+_claims: dict[str, str] = {}
+_claims_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    """下载失败或校验失败"""
+
+
+class DownloadCancelled(DownloadError):
+    """下载被中止（已下载的部分保留在 .part 文件中）"""
+
+
+class UnwantedFileType(DownloadError):
+    """链接的 Content-Type 不是要下载的文件类型"""
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: str
+    size: int
+    sha256: str
+    skipped: bool = False  # 文件已存在，未重新下载
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def record(self) -> dict:
+        """保存到爬取状态中的文件记录"""
+        return {"path": self.path, "size": self.size, "sha256": self.sha256,
+                "etag": self.etag, "last_modified": self.last_modified}
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:10]
+
+
+def with_url_hash(name: str, url: str) -> str:
+    root, ext = os.path.splitext(name)
+    return f"{root}-{url_hash(url)}{ext}"
+
+
+def local_file_name(url: str, content_type: str | None = None, content_disposition: str | None = None) -> str:
+    """根据链接、Content-Disposition 和 Content-Type 得到本地文件名（缺少扩展名时补上）
+
+    链接带查询参数时（例如 /download?id=1）文件名加上链接的哈希，不同参数不会得到同一个文件名。
+    """
+    name = None
+    if content_disposition:
+        message = Message()
+        message["Content-Disposition"] = content_disposition
+        name = message.get_filename()
+    if name:
+        name = os.path.basename(name.replace("\\", "/"))
+    else:
+        name = unquote(os.path.basename(urlparse(url).path)) or "index"
+    if urlparse(url).query:
+        name = with_url_hash(name, url)
+    ext = content_type_extension(content_type)
+    if ext and PurePosixPath(name).suffix.lower() != f".{ext}":
+        name = f"{name}.{ext}"
+    return name
+
+
+def claim_path(url: str, path: str, owner: Callable[[str], str | None] | None = None) -> str:
+    """返回链接使用的本地路径；路径已属于其他链接（本次运行或爬取状态中）时改用加上链接哈希的文件名"""
+    with _claims_lock:
+        claimed = _claims.get(path) or (owner(path) if owner else None)
+        if claimed is not None and claimed != url:
+            path = os.path.join(os.path.dirname(path), with_url_hash(os.path.basename(path), url))
+        _claims[path] = url
+        return path
+
+
+def file_sha256(path: str) -> str:
+    """计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def server_sha256(headers) -> str | None:
+    """从 Repr-Digest / Digest 响应头中取出服务器给出的 SHA-256（十六进制）"""
+    for header in ("Repr-Digest", "Digest"):
+        for item in headers.get(header, "").split(","):
+            algorithm, _, value = item.strip().partition("=")
+            if algorithm.lower() in ("sha-256", "sha256") and value:
+                try:
+                    return base64.b64decode(value.strip(":")).hex()
+                except ValueError:
+                    return None
+    return None
+
+
+def load_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_meta(meta_path: str, meta: dict) -> None:
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def validator(meta: dict) -> str | None:
+    """If-Range 使用的校验值，优先 ETag（弱 ETag 不能用于 If-Range）"""
+    etag = meta.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return meta.get("last_modified")
+
+
+def download_stream(url: str, part_path: str, meta_path: str, meta: dict,
+                    session: requests.Session = session, stop: threading.Event | None = None) -> None:
+    """单连接下载，从记录的偏移量处续传；stop 被设置时保存进度后中止"""
+    offset = meta.get("offset", 0) if os.path.exists(part_path) else 0
+    headers = dict(IDENTITY)
+    if offset > 0:
+        headers["Range"] = f"bytes={offset}-"
+        if validator(meta):
+            headers["If-Range"] = validator(meta)
+
+    with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        if response.status_code == 416 and offset and offset == meta.get("length"):
+            return  # 已经下载完整
+        response.raise_for_status()
+        if response.status_code == 206:
+            start = int(response.headers.get("Content-Range", "bytes 0-").split()[1].split("-")[0])
+            if start != offset:
+                raise DownloadError(f"服务器返回的区间起点 {start} 与偏移量 {offset} 不一致")
+            print(f"续传: {url}，从 {offset} 字节开始")
+        else:
+            # 服务器不支持续传或文件已变化，从头下载
+            if offset:
+                print(f"文件已变化或不支持续传，重新下载: {url}")
+            offset = 0
+            length = response.headers.get("Content-Length")
+            meta["length"] = int(length) if length else None
+        meta["etag"] = response.headers.get("ETag", meta.get("etag"))
+        meta["last_modified"] = response.headers.get("Last-Modified", meta.get("last_modified"))
+
+        with open(part_path, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            unsaved = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                offset += len(chunk)
+                unsaved += len(chunk)
+                stopped = stop is not None and stop.is_set()
+                if unsaved >= SAVE_EVERY or stopped:
+                    f.flush()
+                    meta["offset"] = offset
+                    save_meta(meta_path, meta)
+                    unsaved = 0
+                if stopped:
+                    raise DownloadCancelled(f"下载已中止，已保存 {offset} 字节")
+        meta["offset"] = offset
+        save_meta(meta_path, meta)
+
+
+def download_segments(url: str, part_path: str, meta_path: str, meta: dict, segments: int,
+                      session: requests.Session = session, stop: threading.Event | None = None) -> None:
+    """按字节区间并行下载，每个区间单独记录进度；stop 被设置时保存进度后中止"""
+    length = meta["length"]
+    if not meta.get("segments") or not os.path.exists(part_path):
+        step = -(-length // segments)
+        # 每个区间为 [起点, 终点(含), 已下载到的位置]
+        meta["segments"] = [[start, min(start + step, length) - 1, start] for start in range(0, length, step)]
+        with open(part_path, "wb") as f:
+            f.truncate(length)  # 预分配文件
+        save_meta(meta_path, meta)
+    lock = threading.Lock()
+
+    def fetch(segment: list[int]) -> None:
+        start, end, position = segment
+        if position > end:
+            return
+        headers = {**IDENTITY, "Range": f"bytes={position}-{end}"}
+        if validator(meta):
+            headers["If-Range"] = validator(meta)
+        with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise DownloadError("文件在分段下载期间发生变化")
+            with open(part_path, "r+b") as f:
+                f.seek(position)
+                unsaved = 0
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    chunk = chunk[:end + 1 - position]
+                    f.write(chunk)
+                    position += len(chunk)
+                    unsaved += len(chunk)
+                    stopped = stop is not None and stop.is_set()
+                    if unsaved >= SAVE_EVERY or position > end or stopped:
+                        f.flush()
+                        with lock:
+                            segment[2] = position
+                            save_meta(meta_path, meta)
+                        unsaved = 0
+                    if position > end:
+                        break
+                    if stopped:
+                        raise DownloadCancelled(f"下载已中止，区间 {start}-{end} 已保存到 {position}")
+        if position <= end:
+            raise DownloadError(f"区间 {start}-{end} 未下载完整")
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        for future in [executor.submit(fetch, segment) for segment in meta["segments"]]:
+            future.result()
+    meta["offset"] = length
+    save_meta(meta_path, meta)
+
+
+def unchanged(known: dict, headers) -> bool:
+    """服务器返回的校验信息与上次记录一致"""
+    etag = headers.get("ETag")
+    if etag and known.get("etag"):
+        return etag == known["etag"]
+    last_modified = headers.get("Last-Modified")
+    if last_modified and known.get("last_modified"):
+        return last_modified == known["last_modified"]
+    return True  # 服务器没有提供校验信息，认为未变化
+
+
+def download_file(url: str, download_dir: str, expected_sha256: str | None = None,
+                  segments: int = SEGMENT_COUNT, known: dict | None = None,
+                  extensions: list[str] | None = None,
+                  session: requests.Session = session,
+                  owner: Callable[[str], str | None] | None = None,
+                  stop: threading.Event | None = None) -> DownloadResult:
+    """下载单个文件，支持断点续传、分段并行和完整性校验
+
+    known 为上次下载记录（见 DownloadResult.record），用于发送条件请求，文件未变化时跳过。
+    owner 根据本地路径返回记录中拥有该文件的链接，已存在的文件只有属于该链接（或没有记录）时才跳过。
+    session 默认为 static_fetch 中共用的会话；并发下载时传入连接池足够大的会话。
+    给出 extensions 时，后缀无法判断类型的链接按HEAD响应的 Content-Type 检查，不符合则抛出 UnwantedFileType。
+    stop 被设置时，正在进行的下载保存进度后抛出 DownloadCancelled，下次从 .part 文件续传。
+    """
+    if known and os.path.exists(known.get("path", "")):
+        head = session.head(url, headers={**IDENTITY, **conditional_headers(known)}, allow_redirects=True,
+                            timeout=REQUEST_TIMEOUT)
+        if head.status_code == 304 or (head.ok and unchanged(known, head.headers)):
+            return DownloadResult(url, known["path"], known["size"], known["sha256"], skipped=True,
+                                  etag=known.get("etag"), last_modified=known.get("last_modified"))
+        changed = True
+    else:
+        head = session.head(url, headers=IDENTITY, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+        changed = False
+    head.raise_for_status()
+    if extensions is not None and not file_type_from_suffix(url, extensions)[0]:
+        ext = content_type_extension(head.headers.get("Content-Type"))
+        if ext not in extensions:
+            raise UnwantedFileType(f"不是要下载的文件类型: {head.headers.get('Content-Type')}")
+    if changed:
+        path = known["path"]
+    else:
+        name = local_file_name(url, head.headers.get("Content-Type"), head.headers.get("Content-Disposition"))
+        path = claim_path(url, os.path.join(download_dir, name), owner)
+    if os.path.exists(path) and not changed:
+        return DownloadResult(url, path, os.path.getsize(path), file_sha256(path), skipped=True,
+                              etag=head.headers.get("ETag"), last_modified=head.headers.get("Last-Modified"))
+
+    part_path = path + PART_SUFFIX
+    meta_path = path + META_SUFFIX
+    meta = load_meta(meta_path)
+    length = head.headers.get("Content-Length")
+    length = int(length) if length else None
+    etag = head.headers.get("ETag")
+    if (meta.get("url") != url or (etag and meta.get("etag") and etag != meta["etag"])
+            or (length and meta.get("length") and length != meta["length"])):
+        meta = {"url": url, "offset": 0}  # 没有记录或文件已变化
+    meta.update(length=length, etag=etag or meta.get("etag"),
+                last_modified=head.headers.get("Last-Modified", meta.get("last_modified")))
+    expected_sha256 = expected_sha256 or server_sha256(head.headers)
+
+    ranged = head.headers.get("Accept-Ranges", "").lower() == "bytes"
+    if ranged and length and segments > 1 and (length >= SEGMENT_THRESHOLD or meta.get("segments")):
+        download_segments(url, part_path, meta_path, meta, segments, session, stop)
+    else:
+        download_stream(url, part_path, meta_path, meta, session, stop)
+
+    # 校验长度和哈希
+    size = os.path.getsize(part_path)
+    if meta.get("length") is not None and size != meta["length"]:
+        raise DownloadError(f"长度校验失败: 期望 {meta['length']} 字节，实际 {size} 字节")
+    sha256 = file_sha256(part_path)
+    if expected_sha256 and sha256 != expected_sha256.lower():
+        # 内容已损坏，删除临时文件以便下次从头下载
+        os.remove(part_path)
+        os.remove(meta_path)
+        raise DownloadError(f"哈希校验失败: 期望 {expected_sha256}，实际 {sha256}")
+
+    os.replace(part_path, path)
+    os.remove(meta_path)
+    return DownloadResult(url, path, size, sha256,
+                          etag=meta.get("etag"), last_modified=meta.get("last_modified"))
+
+
+def cleanup_temp_files(download_dir: str) -> None:
+    """清理浏览器遗留的未完成下载文件（.part 文件保留用于续传）"""
+    for file in os.listdir(download_dir):
+        if file.endswith(".crdownload"):
+            os.remove(os.path.join(download_dir, file))
+            print(f"清理临时文件: {file}")
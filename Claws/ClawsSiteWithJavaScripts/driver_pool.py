@@ -0,0 +1,206 @@
+"""
+无头 Chrome 浏览器池：启动一次、健康检查、按页数或内存增长回收，并租借给工作线程。
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+try:
+    import psutil  # 可选：用于统计浏览器进程内存
+except ImportError:
+    psutil = None
+
+T = TypeVar("T")
+# 屏蔽资源时使用的URL模式
+BLOCKED_URL_PATTERNS = ["*.css", "*.woff", "*.woff2", "*.ttf", "*.otf",
+                        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico"]
+LISTING_READY = "#main-container .list-title"  # 列表渲染完成的标志
+LEASE_TIMEOUT = 120  # 等待空闲浏览器实例的最长时间（秒）
+
+
+def setup_driver(download_dir: str, chromedriver_path: str, headless: bool = False,
+                 block_resources: bool = False) -> webdriver.Chrome:
+    """配置Chrome WebDriver"""
+    chrome_options = webdriver.ChromeOptions()
+    # 设置下载路径和自动下载行为
+    prefs = {
+        "download.default_directory": os.path.abspath(download_dir),
+        "plugins.always_open_pdf_externally": True,  # 自动下载PDF
+        "download.prompt_for_download": False,
+    }
+    if block_resources:
+        # 禁止加载图片
+        prefs["profile.managed_default_content_settings.images"] = 2
+    chrome_options.add_experimental_option("prefs", prefs)
+    chrome_options.add_argument('--ignore-certificate-errors')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    if headless:
+        chrome_options.add_argument('--headless=new')  # 无头模式
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+
+    # 使用本地chromedriver
+    service = Service(executable_path=chromedriver_path)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if block_resources:
+        # 通过CDP屏蔽字体、CSS等静态资源
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return driver
+
+
+def get_page_source(driver: webdriver.Chrome) -> str:
+    """等待列表渲染完成后返回页面源码"""
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, LISTING_READY)))
+    return driver.page_source
+
+
+def driver_memory_mb(driver: webdriver.Chrome) -> float:
+    """获取浏览器占用的内存（MB），优先统计进程RSS，否则退回JS堆大小"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / 1024 / 1024
+        except Exception:
+            pass
+    try:
+        used = driver.execute_script(
+            "return window.performance.memory ? window.performance.memory.usedJSHeapSize : 0")
+        return (used or 0) / 1024 / 1024
+    except Exception:
+        return 0.0
+
+
+class PooledDriver:
+    """池中的单个浏览器实例及其使用统计；driver 为 None 表示启动失败留下的占位"""
+
+    def __init__(self, driver: webdriver.Chrome | None):
+        self.driver = driver
+        self.pages = 0
+        self.baseline_mb = driver_memory_mb(driver) if driver is not None else 0.0
+        self.created = time.monotonic()
+
+    def is_healthy(self) -> bool:
+        """检查浏览器是否仍可响应"""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def quit(self) -> None:
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"关闭浏览器失败: {e}")
+
+
+class DriverPool:
+    """可复用的浏览器池，每个工作线程通过 lease() 租借一个实例"""
+
+    def __init__(self, factory: Callable[[], webdriver.Chrome], size: int = 4,
+                 max_pages: int = 50, max_memory_growth_mb: float = 300.0):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages  # 每个实例处理多少页面后回收
+        self.max_memory_growth_mb = max_memory_growth_mb  # 内存增长超过该值后回收
+        self._idle: "queue.Queue[PooledDriver]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.recycled = 0
+
+        # 并行启动所有浏览器
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            for slot in executor.map(lambda _: PooledDriver(self.factory()), range(size)):
+                self._idle.put(slot)
+        print(f"浏览器池已启动: {size} 个实例")
+
+    def _needs_recycle(self, slot: PooledDriver) -> bool:
+        if slot.pages >= self.max_pages:
+            return True
+        growth = driver_memory_mb(slot.driver) - slot.baseline_mb
+        return growth > self.max_memory_growth_mb
+
+    def _replace(self, slot: PooledDriver, reason: str) -> PooledDriver:
+        print(f"回收浏览器实例（{reason}），已处理 {slot.pages} 个页面")
+        slot.quit()
+        with self._lock:
+            self.recycled += 1
+        return PooledDriver(self.factory())
+
+    @contextmanager
+    def lease(self, timeout: float | None = None) -> Iterator[webdriver.Chrome]:
+        """租借一个健康的浏览器实例，用完后自动归还；timeout 秒内没有空闲实例时抛出 TimeoutError"""
+        if self._closed:
+            raise RuntimeError("浏览器池已关闭")
+        try:
+            slot = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待浏览器实例超过 {timeout} 秒") from None
+        try:
+            if not slot.is_healthy():
+                slot = self._replace(slot, "健康检查失败")
+        except Exception:
+            # 浏览器启动失败：放回占位，下次租借时再尝试启动，池大小不变
+            self._idle.put(PooledDriver(None))
+            raise
+        try:
+            yield slot.driver
+            slot.pages += 1
+        finally:
+            self._release(slot)
+
+    def _release(self, slot: PooledDriver) -> None:
+        if self._closed:
+            slot.quit()
+            return
+        try:
+            if self._needs_recycle(slot):
+                slot = self._replace(slot, "页数或内存超限")
+        except Exception as e:
+            # 重启失败时放回占位，下次租借时健康检查失败会再次启动，池大小不变
+            print(f"回收浏览器实例失败: {e}")
+            slot = PooledDriver(None)
+        self._idle.put(slot)
+
+    def close(self) -> None:
+        """关闭池中所有浏览器"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().quit()
+            except queue.Empty:
+                break
+
+
+def render_pages(pool: DriverPool, urls: list[str], extract: Callable[[webdriver.Chrome], T],
+                 lease_timeout: float | None = LEASE_TIMEOUT) -> dict[str, T]:
+    """用浏览器池并行渲染页面，并对每个页面调用 extract 提取结果（失败的页面不在结果中）"""
+    def render(url: str) -> T:
+        with pool.lease(timeout=lease_timeout) as driver:
+            driver.get(url)
+            return extract(driver)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = {url: executor.submit(render, url) for url in urls}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                print(f"渲染页面失败: {url} - {e}")
+    return results
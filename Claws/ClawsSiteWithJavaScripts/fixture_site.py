@@ -0,0 +1,182 @@
+"""
+本地测试站点：模拟 arxiv 搜索列表页，用于离线基准测试。
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 50  # 每页条目数
+TOTAL_ENTRIES = 500  # 站点总条目数
+FILE_SIZE = 64 * 1024  # 每个文件的默认大小（字节）
+PAGE_LATENCY = 0.0  # 列表页的模拟服务器延迟（秒）
+FILE_LATENCY = 0.0  # 文件请求的模拟服务器延迟（秒）
+ASSET_DELAY = 0.2  # 静态资源（图片、字体、CSS）的模拟延迟（秒）
+JS_RENDER_DELAY_MS = 100  # JS 渲染列表前的模拟延迟（毫秒）
+
+
+def entry_id(index: int) -> str:
+    """第 index 条（0 为最新）对应的论文编号"""
+    return f"2401.{TOTAL_ENTRIES - index:05d}"
+
+
+def render_entry(index: int) -> str:
+    """生成单个条目的 HTML，结构与 arxiv 搜索结果一致"""
+    paper_id = entry_id(index)
+    return f"""
+<li class="arxiv-result">
+  <div class="is-marginless">
+    <p class="list-title is-inline-block"><a href="/abs/{paper_id}">arXiv:{paper_id}</a>
+      <span>&nbsp;[<a href="/pdf/{paper_id}">pdf</a>]</span></p>
+    <div class="tags is-inline-block">
+      <span class="tag is-small is-link tooltip is-tooltip-top" data-tooltip="Optics">physics.optics</span></div>
+  </div>
+  <p class="title is-5 mathjax">Fixture paper number {paper_id}</p>
+  <p class="authors"><span class="search-hit">Authors:</span>
+    <a href="/search/?searchtype=author&amp;query=Alice">Alice</a>,
+    <a href="/search/?searchtype=author&amp;query=Bob">Bob</a></p>
+  <p class="abstract mathjax"><span class="abstract-full has-text-grey-dark mathjax">
+    Abstract of fixture paper {paper_id}.</span></p>
+  <p class="is-size-7"><span class="has-text-black-bis has-text-weight-semibold">Submitted</span>
+    {index % 28 + 1} January, 2024;
+    <span class="has-text-black-bis has-text-weight-semibold">originally announced</span> January 2024.</p>
+</li>"""
+
+
+def render_listing(start: int, size: int, js: bool) -> str:
+    """生成列表页；js=True 时列表由脚本延迟插入，模拟需要 JavaScript 的页面"""
+    entries = "".join(render_entry(i) for i in range(start, min(start + size, TOTAL_ENTRIES)))
+    head = """<link rel="stylesheet" href="/static/style.css">
+<link rel="preload" href="/static/font.woff2" as="font" crossorigin>"""
+    if js:
+        escaped = entries.replace("\\", "\\\\").replace("`", "\\`")
+        body = f"""<div id="main-container"></div>
+<script>
+setTimeout(function () {{
+  document.getElementById("main-container").innerHTML = `<ol class="breathe-horizontal">{escaped}</ol>`;
+}}, {JS_RENDER_DELAY_MS});
+</script>"""
+    else:
+        body = f'<div id="main-container"><ol class="breathe-horizontal">{entries}</ol></div>'
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Fixture listing</title>{head}</head>
+<body><img src="/static/logo.png">{body}</body></html>"""
+
+
+def file_bytes(paper_id: str, size: int | None = None) -> bytes:
+    """生成确定性的伪 PDF 内容"""
+    size = FILE_SIZE if size is None else size
+    seed = hashlib.sha256(paper_id.encode()).digest()
+    return b"%PDF-1.4\n" + (seed * (size // len(seed) + 1))[:size]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # 保持基准测试输出整洁
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_file(self, body: bytes, content_type: str) -> None:
+        """发送文件，支持 Range / If-Range 以便测试断点续传"""
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        start, end = 0, len(body) - 1
+        partial = bool(range_header) and (not if_range or if_range == etag)
+        if partial:
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start = int(first)
+            end = min(int(last), end) if last else end
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        chunk = body[start:end + 1]
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(chunk)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(chunk)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/search/physics":
+            time.sleep(PAGE_LATENCY)
+            start = int(query.get("start", ["0"])[0])
+            size = int(query.get("size", [str(PAGE_SIZE)])[0])
+            js = query.get("js", ["0"])[0] == "1"
+            body = render_listing(start, size, js).encode("utf-8")
+            etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+        elif url.path.startswith("/pdf/"):
+            time.sleep(FILE_LATENCY)
+            size = int(query.get("bytes", [str(FILE_SIZE)])[0])
+            self._send_file(file_bytes(url.path[len("/pdf/"):], size), "application/pdf")
+        elif url.path.startswith("/static/"):
+            time.sleep(ASSET_DELAY)
+            self._send(200, b"", "application/octet-stream")
+        elif url.path == "/robots.txt":
+            self._send(200, b"User-agent: *\nAllow: /\n", "text/plain")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+
+class FixtureServer(ThreadingHTTPServer):
+    request_queue_size = 1024  # 基准测试时并发连接较多
+
+
+def start_fixture_site(port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """在后台线程启动测试站点，返回服务器及其根地址"""
+    server = FixtureServer(("127.0.0.1", port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="模拟 arxiv 列表页的本地测试站点")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--entries", type=int, default=TOTAL_ENTRIES, help="条目总数")
+    parser.add_argument("--file-size", type=int, default=FILE_SIZE, help="文件大小（字节）")
+    parser.add_argument("--page-latency", type=float, default=PAGE_LATENCY, help="列表页延迟（秒）")
+    parser.add_argument("--file-latency", type=float, default=FILE_LATENCY, help="文件请求延迟（秒）")
+    args = parser.parse_args()
+    TOTAL_ENTRIES, FILE_SIZE = args.entries, args.file_size
+    PAGE_LATENCY, FILE_LATENCY = args.page_latency, args.file_latency
+
+    server, base_url = start_fixture_site(args.port)
+    print(f"测试站点已启动: {base_url}/search/physics?query=123&size={PAGE_SIZE}&js=1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
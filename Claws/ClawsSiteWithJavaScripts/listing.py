@@ -0,0 +1,177 @@
+"""
+解析 arxiv 搜索列表页中的条目（论文编号、链接、标题、作者、摘要、日期）。
+"""
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+ENTRY_CLASS = "arxiv-result"  # 每个条目的 <li> 类名
+ID_PATTERN = re.compile(r"arXiv:(\S+)")
+ANNOUNCED_PATTERN = re.compile(r"originally announced\s+([A-Za-z]+\s+\d{4})")
+SUBMITTED_PATTERN = re.compile(r"Submitted\s+(\d{1,2}\s+[A-Za-z]+,?\s+\d{4})")
+# 条目内各字段对应的 (标签, 类名)
+FIELD_CLASSES = {
+    ("p", "title"): "title",
+    ("p", "authors"): "authors",
+    ("p", "abstract"): "abstract",
+    ("span", "abstract-full"): "abstract_full",
+    ("p", "is-size-7"): "dates",
+    ("p", "comments"): "comments",
+}
+MONTHS = {name: i for i, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"], start=1)}
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "source", "track", "wbr"}
+
+
+@dataclass
+class ListingEntry:
+    entry_id: str
+    links: list[str] = field(default_factory=list)
+    announced: str | None = None  # 例如 "January 2024"
+    title: str | None = None
+    authors: list[str] = field(default_factory=list)
+    abstract: str | None = None
+    submitted: str | None = None  # 例如 "3 January, 2024"
+    categories: list[str] = field(default_factory=list)
+    comments: str | None = None
+
+    @property
+    def abs_url(self) -> str | None:
+        return next((link for link in self.links if "/abs/" in link), None)
+
+
+def clean_text(parts: list[str]) -> str:
+    return " ".join(" ".join(parts).split())
+
+
+class ListingParser(HTMLParser):
+    """按 <li class="arxiv-result"> 切分条目，收集每个条目的链接和标题、作者、摘要等字段"""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+        self.entries: list[ListingEntry] = []
+        # 当前条目内打开的元素，每项为 (标签, 所属字段)；为空表示不在条目内
+        self.stack: list[tuple[str, str | None]] = []
+        self._reset()
+
+    def _reset(self):
+        self._text: list[str] = []
+        self._links: list[str] = []
+        self._fields: dict[str, list[str]] = {}
+        self._authors: list[list[str]] = []
+        self._categories: list[list[str]] = []
+
+    def _field(self, tag: str, classes: list[str], attrs: dict) -> str | None:
+        for class_name in classes:
+            name = FIELD_CLASSES.get((tag, class_name))
+            if name:
+                return name
+        # 分类标签带有 data-tooltip（分类全名）
+        if tag == "span" and "tag" in classes and attrs.get("data-tooltip"):
+            return "category"
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if not self.stack:
+            if tag == "li" and ENTRY_CLASS in classes:
+                self.stack.append((tag, None))
+                self._reset()
+            return
+        parent = self.stack[-1][1]
+        name = self._field(tag, classes, attrs) or parent
+        if tag == "a" and attrs.get("href"):
+            self._links.append(urljoin(self.base_url, attrs["href"]))
+            if parent == "authors":
+                self._authors.append([])
+                name = "author"
+        if name == "category" and parent != "category":
+            self._categories.append([])
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, name))
+
+    def handle_endtag(self, tag):
+        if not self.stack or tag in VOID_ELEMENTS:
+            return
+        # 弹出到匹配的标签为止，容忍未闭合的元素
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+        if not self.stack:
+            self._finish_entry()
+
+    def handle_data(self, data):
+        if not self.stack:
+            return
+        self._text.append(data)
+        name = self.stack[-1][1]
+        if name == "author":
+            self._authors[-1].append(data)
+        elif name == "category":
+            self._categories[-1].append(data)
+        elif name:
+            self._fields.setdefault(name, []).append(data)
+
+    def _finish_entry(self):
+        text = clean_text(self._text)
+        match = ID_PATTERN.search(text)
+        if not match:
+            return
+        announced = ANNOUNCED_PATTERN.search(text)
+        submitted = SUBMITTED_PATTERN.search(clean_text(self._fields.get("dates", [])))
+        abstract = clean_text(self._fields.get("abstract_full") or self._fields.get("abstract", []))
+        # 去掉 arxiv 摘要中的“展开/收起”按钮文字
+        abstract = abstract.removesuffix("△ Less").removeprefix("Abstract:").strip()
+        self.entries.append(ListingEntry(
+            entry_id=match.group(1),
+            links=list(dict.fromkeys(self._links)),
+            announced=announced.group(1) if announced else None,
+            title=clean_text(self._fields.get("title", [])) or None,
+            authors=[name for name in (clean_text(parts) for parts in self._authors) if name],
+            abstract=abstract or None,
+            submitted=submitted.group(1) if submitted else None,
+            categories=[name for name in (clean_text(parts) for parts in self._categories) if name],
+            comments=clean_text(self._fields.get("comments", [])).removeprefix("Comments:").strip() or None,
+        ))
+
+
+def parse_listing(html: str, base_url: str) -> list[ListingEntry]:
+    """解析列表页，按页面顺序返回条目"""
+    parser = ListingParser(base_url)
+    parser.feed(html)
+    parser.close()
+    return parser.entries
+
+
+def announced_key(announced: str | None) -> tuple[int, int] | None:
+    """把 "January 2024" 转换成可比较的 (年, 月)，无法识别时返回 None"""
+    parts = (announced or "").split()
+    if len(parts) != 2 or parts[0].lower() not in MONTHS or not parts[1].isdigit():
+        return None
+    return int(parts[1]), MONTHS[parts[0].lower()]
+
+
+def announced_before(announced: str | None, cursor: str | None) -> bool:
+    """条目的公布月份早于游标月份（任一无法识别时返回 False）"""
+    key, cursor_key = announced_key(announced), announced_key(cursor)
+    return key is not None and cursor_key is not None and key < cursor_key
+
+
+def page_url(query_url: str, start: int) -> str:
+    """生成指定起始位置的分页地址"""
+    parts = urlparse(query_url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != "start"]
+    if start:
+        query.append(("start", str(start)))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def page_size(query_url: str, default: int = 50) -> int:
+    """列表页的每页条目数（size 参数）"""
+    return int(dict(parse_qsl(urlparse(query_url).query)).get("size", default))
@@ -0,0 +1,115 @@
+"""
+论文元数据：把列表页条目转换成结构化记录，按批增量写入 JSONL（可选 Parquet）。
+"""
+import json
+import os
+import time
+
+from downloader import DownloadResult
+from listing import ListingEntry
+
+try:
+    import pyarrow as pa  # 可选：写入列式 Parquet 文件
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+BATCH_SIZE = 100  # 每批写入的记录数
+
+if pa is not None:
+    RECORD_SCHEMA = pa.schema([
+        ("id", pa.string()),
+        ("title", pa.string()),
+        ("authors", pa.list_(pa.string())),
+        ("abstract", pa.string()),
+        ("submitted", pa.string()),
+        ("announced", pa.string()),
+        ("categories", pa.list_(pa.string())),
+        ("comments", pa.string()),
+        ("abs_url", pa.string()),
+        ("file_url", pa.string()),
+        ("file_path", pa.string()),
+        ("sha256", pa.string()),
+        ("size", pa.int64()),
+        ("query", pa.string()),
+        ("crawled_at", pa.float64()),
+    ])
+
+
+def entry_record(entry: ListingEntry, file_url: str | None, result: DownloadResult | None,
+                 query: str) -> dict:
+    """把条目和对应文件的下载结果（摘要、大小）合并成一条记录"""
+    return {
+        "id": entry.entry_id,
+        "title": entry.title,
+        "authors": entry.authors,
+        "abstract": entry.abstract,
+        "submitted": entry.submitted,
+        "announced": entry.announced,
+        "categories": entry.categories,
+        "comments": entry.comments,
+        "abs_url": entry.abs_url,
+        "file_url": file_url,
+        **file_fields(result),
+        "query": query,
+        "crawled_at": time.time(),
+    }
+
+
+def file_fields(result: DownloadResult | None) -> dict:
+    """记录中与下载结果有关的字段"""
+    return {
+        "file_path": result.path if result else None,
+        "sha256": result.sha256 if result else None,
+        "size": result.size if result else None,
+    }
+
+
+class MetadataWriter:
+    """缓存记录并按批追加写入 JSONL；设置 parquet_path 且安装了 pyarrow 时同时写入 Parquet"""
+
+    def __init__(self, jsonl_path: str, parquet_path: str | None = None, batch_size: int = BATCH_SIZE):
+        self.jsonl_path = jsonl_path
+        self.batch_size = batch_size
+        self.batch: list[dict] = []
+        self.written = 0
+        os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+        self._parquet = None
+        if parquet_path and pq is None:
+            print("未安装 pyarrow，跳过 Parquet 输出")
+            parquet_path = None
+        self.parquet_path = parquet_path
+
+    def write(self, record: dict) -> None:
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """把当前批次写入磁盘"""
+        if not self.batch:
+            return
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self.batch)
+        if self.parquet_path:
+            if self._parquet is None:
+                # Parquet 文件不能追加，每次运行写一个新文件，每批作为一个行组
+                root, ext = os.path.splitext(self.parquet_path)
+                path = f"{root}-{time.strftime('%Y%m%d-%H%M%S')}{ext or '.parquet'}"
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._parquet = pq.ParquetWriter(path, RECORD_SCHEMA)
+            self._parquet.write_table(pa.Table.from_pylist(self.batch, schema=RECORD_SCHEMA))
+        self.written += len(self.batch)
+        self.batch = []
+
+    def close(self) -> None:
+        self.flush()
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,137 @@
+"""
+爬虫运行指标：各阶段耗时、计数、吞吐量、队列深度、各站点延迟分位数和礼貌等待时间。
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+MAX_SAMPLES = 10000  # 每个站点 / 阶段保留的最近耗时样本数
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """最近秩法计算分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    samples: deque = field(default_factory=lambda: deque(maxlen=MAX_SAMPLES))
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        samples = list(self.samples)
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 3),
+            "mean_s": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50_s": round(percentile(samples, 50), 4),
+            "p90_s": round(percentile(samples, 90), 4),
+            "p99_s": round(percentile(samples, 99), 4),
+            "max_s": round(self.max, 4),
+        }
+
+
+class Metrics:
+    """指标收集器（只在事件循环线程中更新，无需加锁）"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters: Counter[str] = Counter()
+        self.stages: defaultdict[str, StageStats] = defaultdict(StageStats)
+        # 按 (站点, 阶段) 分开统计，页面请求和整个文件的下载耗时不混在一起
+        self.hosts: defaultdict[tuple[str, str], StageStats] = defaultdict(StageStats)
+        self.queues: dict[str, asyncio.Queue] = {}
+        self.queue_max: Counter[str] = Counter()
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def observe(self, stage: str, seconds: float, host: str | None = None) -> None:
+        self.stages[stage].add(seconds)
+        if host:
+            self.hosts[(host, stage)].add(seconds)
+
+    @contextmanager
+    def timer(self, stage: str, host: str | None = None):
+        """统计代码块耗时；host 不为空时同时计入该站点在该阶段的延迟"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, host)
+
+    def watch_queue(self, name: str, queue: asyncio.Queue) -> None:
+        self.queues[name] = queue
+
+    def sample_queues(self) -> dict[str, int]:
+        depths = {name: queue.qsize() for name, queue in self.queues.items()}
+        for name, depth in depths.items():
+            self.queue_max[name] = max(self.queue_max[name], depth)
+        return depths
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def snapshot(self) -> dict:
+        """可序列化的指标快照"""
+        elapsed = self.elapsed()
+        depths = self.sample_queues()
+        hosts: dict[str, dict] = {}
+        for (host, stage), stats in sorted(self.hosts.items()):
+            hosts.setdefault(host, {})[stage] = stats.summary()
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "counters": dict(self.counters),
+            "rates": {
+                "pages_per_s": round(self.counters["pages"] / elapsed, 3) if elapsed else 0.0,
+                "files_per_s": round(self.counters["files"] / elapsed, 3) if elapsed else 0.0,
+                "bytes_per_s": round(self.counters["bytes"] / elapsed, 1) if elapsed else 0.0,
+            },
+            "stages": {name: stats.summary() for name, stats in sorted(self.stages.items())},
+            "hosts": hosts,
+            "queues": {name: {"depth": depth, "max": self.queue_max[name]} for name, depth in depths.items()},
+        }
+
+    def progress_line(self) -> str:
+        """一行实时进度摘要"""
+        elapsed = self.elapsed()
+        c = self.counters
+        depths = " ".join(f"{name}={depth}" for name, depth in self.sample_queues().items())
+        return (f"[{elapsed:7.1f}s] 页面 {c['pages']} ({c['pages'] / elapsed:.2f}/s) | "
+                f"条目 {c['entries']} | 文件 {c['files']} 跳过 {c['files_skipped']} 失败 {c['errors']} | 索引 {c['indexed']} | "
+                f"{c['bytes'] / elapsed / 1024 / 1024:.2f} MB/s | 重试 {c['retries']} | "
+                f"礼貌等待 {self.stages['politeness_wait'].total:.1f}s | 队列 {depths}")
+
+    def dump(self, path: str) -> None:
+        """把指标快照写成 JSON"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+async def report_progress(metrics: Metrics, interval: float, sample_every: float = 0.5) -> None:
+    """定期采样队列深度，每隔 interval 秒打印一次进度"""
+    last_report = time.monotonic()
+    while True:
+        await asyncio.sleep(sample_every)
+        metrics.sample_queues()
+        if time.monotonic() - last_report >= interval:
+            last_report = time.monotonic()
+            print(metrics.progress_line())
@@ -0,0 +1,117 @@
+"""
+静态解析：用HTML解析器从普通HTTP请求取得的页面中提取链接（解析不到时页面需要交给浏览器），并按链接判断文件类型。
+"""
+import mimetypes
+from html.parser import HTMLParser
+from pathlib import PurePosixPath
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+try:
+    import lxml.html  # 可选：更快的HTML解析器
+except ImportError:
+    lxml = None
+
+USER_AGENT = "Mozilla/5.0 (compatible; ClawsCrawler/1.0)"
+REQUEST_TIMEOUT = 15  # 请求超时时间（秒）
+
+# Content-Type 与文件扩展名的对应关系
+CONTENT_TYPE_EXTENSIONS = {
+    "application/pdf": "pdf",
+    "application/x-pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+# 路径中出现这些片段（或要下载的扩展名，例如 arxiv 的 /pdf/<id>）的链接才可能是文件
+DOWNLOAD_HINTS = {"download", "downloads", "file", "files", "attachment", "attachments"}
+# HTML中的空元素没有结束标签，不计入嵌套深度
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "source", "track", "wbr"}
+
+session = requests.Session()
+session.headers["User-Agent"] = USER_AGENT
+
+
+class ContainerLinkParser(HTMLParser):
+    """提取指定容器内所有 <a href>，并记录是否出现了标记类名"""
+
+    def __init__(self, container_id: str, marker_class: str):
+        super().__init__()
+        self.container_id = container_id
+        self.marker_class = marker_class
+        self.depth = 0  # 当前在容器内的嵌套深度，0 表示在容器外
+        self.found_container = False
+        self.found_marker = False
+        self.hrefs: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self.depth == 0:
+            if attrs.get("id") == self.container_id:
+                self.found_container = True
+                self.depth = 1
+            return
+        if tag not in VOID_ELEMENTS:
+            self.depth += 1
+        if self.marker_class in (attrs.get("class") or "").split():
+            self.found_marker = True
+        if tag == "a" and attrs.get("href"):
+            self.hrefs.append(attrs["href"])
+
+    def handle_startendtag(self, tag, attrs):
+        depth = self.depth
+        self.handle_starttag(tag, attrs)
+        self.depth = depth  # 自闭合标签不改变嵌套深度
+
+    def handle_endtag(self, tag):
+        if self.depth > 0 and tag not in VOID_ELEMENTS:
+            self.depth -= 1
+
+
+def parse_container_links(html: str, base_url: str, container_id: str = "main-container",
+                          marker_class: str = "list-title") -> list[str] | None:
+    """解析容器内的链接，返回绝对地址；若容器或标记类不存在（多半需要JS渲染）则返回 None"""
+    if not html.strip():
+        return None
+    if lxml is not None:
+        doc = lxml.html.fromstring(html)
+        containers = doc.xpath(f'//*[@id="{container_id}"]')
+        if not containers:
+            return None
+        container = containers[0]
+        if not container.xpath(f'.//*[contains(concat(" ", normalize-space(@class), " "), " {marker_class} ")]'):
+            return None
+        hrefs = container.xpath(".//a/@href")
+    else:
+        parser = ContainerLinkParser(container_id, marker_class)
+        parser.feed(html)
+        parser.close()
+        if not (parser.found_container and parser.found_marker):
+            return None
+        hrefs = parser.hrefs
+    return list(dict.fromkeys(urljoin(base_url, href) for href in hrefs))
+
+
+def content_type_extension(content_type: str | None) -> str | None:
+    """根据 Content-Type 得到文件扩展名"""
+    if not content_type:
+        return None
+    return CONTENT_TYPE_EXTENSIONS.get(content_type.split(";")[0].strip().lower())
+
+
+def file_type_from_suffix(url: str, extensions: list[str]) -> tuple[bool, str | None]:
+    """根据路径后缀判断文件类型，返回 (是否已确定, 扩展名)；未确定时需要再看 Content-Type"""
+    suffix = PurePosixPath(urlparse(url).path).suffix.lower()
+    if suffix[1:] in extensions:
+        return True, suffix[1:]
+    if suffix in mimetypes.types_map:
+        return True, None  # 已知的其他类型，例如 .html
+    return False, None
+
+
+def is_download_candidate(url: str, extensions: list[str]) -> bool:
+    """后缀无法判断类型的链接中，只有路径像下载地址的才值得探测（/abs/、作者搜索等不是）"""
+    segments = {segment.lower() for segment in PurePosixPath(urlparse(url).path).parts}
+    return bool(segments & (DOWNLOAD_HINTS | set(extensions)))
+
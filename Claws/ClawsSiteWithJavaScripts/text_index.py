@@ -0,0 +1,250 @@
+"""
+下载后处理：用进程池从 pdf / docx / xlsx 中提取文本和基本元数据，写入 SQLite FTS5 全文索引。
+按文件的 SHA-256 增量处理，已索引过的内容不再提取。
+
+python text_index.py build ./downloads        # 索引下载目录中新增的文件
+python text_index.py search "quantum dot"     # 全文检索
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.etree import ElementTree
+
+from downloader import file_sha256
+
+try:
+    from pypdf import PdfReader  # 可选：提取 pdf 文本
+except ImportError:
+    PdfReader = None
+
+INDEX_FILE = "./metadata/text_index.sqlite"
+MAX_TEXT_CHARS = 2_000_000  # 每个文件最多索引的字符数
+COMMIT_EVERY = 200  # 每写入多少个文件提交一次事务
+
+# Office Open XML 命名空间
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+
+# ---------- 文本提取（在子进程中运行） ----------
+
+def xml_text(archive: zipfile.ZipFile, name: str, text_tag: str, break_tag: str) -> list[str]:
+    """逐块读取 XML，收集 text_tag 中的文字，遇到 break_tag 结束时换段"""
+    parts, current = [], []
+    with archive.open(name) as f:
+        for _, element in ElementTree.iterparse(f):
+            if element.tag == text_tag and element.text:
+                current.append(element.text)
+            elif element.tag == break_tag and current:
+                parts.append("".join(current))
+                current = []
+            element.clear()  # 已读过的元素及时释放，大文件也不会占用太多内存
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def core_properties(archive: zipfile.ZipFile) -> dict:
+    """读取 docProps/core.xml 中的标题和作者"""
+    try:
+        root = ElementTree.fromstring(archive.read("docProps/core.xml"))
+    except (KeyError, ElementTree.ParseError):
+        return {}
+    return {"title": root.findtext(f"{DC_NS}title"), "author": root.findtext(f"{DC_NS}creator")}
+
+
+def extract_docx(path: str) -> dict:
+    with zipfile.ZipFile(path) as archive:
+        paragraphs = xml_text(archive, "word/document.xml", f"{W_NS}t", f"{W_NS}p")
+        return {**core_properties(archive), "pages": None, "text": "\n".join(paragraphs)}
+
+
+def extract_xlsx(path: str) -> dict:
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        # 单元格文字大多在共享字符串表中，内联字符串在各工作表中
+        cells = xml_text(archive, "xl/sharedStrings.xml", f"{S_NS}t", f"{S_NS}si") \
+            if "xl/sharedStrings.xml" in names else []
+        sheets = [name for name in names if name.startswith("xl/worksheets/sheet")]
+        for sheet in sheets:
+            cells += xml_text(archive, sheet, f"{S_NS}t", f"{S_NS}is")
+        return {**core_properties(archive), "pages": len(sheets), "text": "\n".join(cells)}
+
+
+def extract_pdf(path: str) -> dict:
+    reader = PdfReader(path)
+    info = reader.metadata or {}
+    texts, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        texts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return {"title": info.get("/Title"), "author": info.get("/Author"),
+            "pages": len(reader.pages), "text": "\n".join(texts)}
+
+
+# 未安装 pypdf 时不处理 pdf，安装后重新运行即可补上索引
+EXTRACTORS = {"docx": extract_docx, "xlsx": extract_xlsx}
+if PdfReader is not None:
+    EXTRACTORS["pdf"] = extract_pdf
+
+
+def extract_file(path: str, sha256: str | None = None) -> dict:
+    """提取单个文件的文本和元数据；未给出摘要时顺便计算。失败时返回带 error 的记录"""
+    started = time.perf_counter()
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    record = {"sha256": sha256 or file_sha256(path), "path": path, "ext": ext,
+              "size": os.path.getsize(path), "title": None, "author": None, "pages": None,
+              "text": "", "error": None}
+    try:
+        record.update(EXTRACTORS[ext](path))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["text"] = record["text"][:MAX_TEXT_CHARS]
+    record["seconds"] = time.perf_counter() - started
+    return record
+
+
+def make_pool(workers: int = 0) -> ProcessPoolExecutor:
+    """提取用的进程池，workers 为 0 时使用全部 CPU 核心"""
+    # spawn 启动的子进程不继承父进程的线程和连接，Windows / Linux 行为一致
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+# ---------- 索引 ----------
+
+class TextIndex:
+    """保存在 SQLite 中的全文索引，documents 表记录已处理的摘要，documents_fts 为 FTS5 全文表"""
+
+    def __init__(self, path: str = INDEX_FILE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                ext TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                title TEXT,
+                author TEXT,
+                pages INTEGER,
+                chars INTEGER,
+                error TEXT,
+                indexed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS documents_path ON documents(path);
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                sha256 UNINDEXED, title, author, text, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        self.uncommitted = 0
+
+    def processed(self, sha256: str) -> bool:
+        return self.db.execute("SELECT 1 FROM documents WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+    def unchanged(self, path: str) -> bool:
+        """按路径、大小和修改时间判断文件是否已索引，避免重新计算摘要"""
+        stat = os.stat(path)
+        return self.db.execute("SELECT 1 FROM documents WHERE path = ? AND size = ? AND mtime_ns = ?",
+                               (path, stat.st_size, stat.st_mtime_ns)).fetchone() is not None
+
+    def add(self, record: dict) -> bool:
+        """写入一条提取结果；同一内容已索引过时只更新路径，返回是否新增"""
+        try:
+            mtime_ns = os.stat(record["path"]).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if self.processed(record["sha256"]):
+            self.db.execute("UPDATE documents SET path = ?, mtime_ns = ? WHERE sha256 = ?",
+                            (record["path"], mtime_ns, record["sha256"]))
+            return False
+        self.db.execute(
+            "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record["sha256"], record["path"], record["ext"], record["size"], mtime_ns, record["title"],
+             record["author"], record["pages"], len(record["text"]), record["error"], time.time()))
+        if record["text"]:
+            self.db.execute("INSERT INTO documents_fts VALUES (?, ?, ?, ?)",
+                            (record["sha256"], record["title"], record["author"], record["text"]))
+        self.uncommitted += 1
+        if self.uncommitted >= COMMIT_EVERY:
+            self.commit()
+        return True
+
+    def commit(self) -> None:
+        self.db.commit()
+        self.uncommitted = 0
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        """FTS5 查询语法，按相关度排序"""
+        rows = self.db.execute("""
+            SELECT d.path, d.title, snippet(documents_fts, 3, '[', ']', '…', 16)
+            FROM documents_fts JOIN documents d USING (sha256)
+            WHERE documents_fts MATCH ? ORDER BY rank LIMIT ?
+        """, (query, limit)).fetchall()
+        return [{"path": path, "title": title, "snippet": snippet} for path, title, snippet in rows]
+
+    def close(self) -> None:
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_index(download_dir: str, index: TextIndex, workers: int = 0) -> int:
+    """索引下载目录中新增或变化的文件，返回新增的文件数"""
+    paths = [os.path.join(root, name) for root, _, names in os.walk(download_dir) for name in names
+             if os.path.splitext(name)[1].lstrip(".").lower() in EXTRACTORS]
+    paths = [path for path in paths if not index.unchanged(path)]
+    print(f"待处理文件: {len(paths)}")
+    added = 0
+    with make_pool(workers) as pool:
+        # 摘要在子进程中计算，已索引过的内容只更新路径
+        futures = [pool.submit(extract_file, path) for path in paths]
+        for future in as_completed(futures):
+            record = future.result()
+            if record["error"]:
+                print(f"提取失败: {record['path']} - {record['error']}")
+            added += index.add(record)
+    index.commit()
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="下载文件的全文索引")
+    parser.add_argument("--index", default=INDEX_FILE, help="索引文件")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="索引下载目录中新增的文件")
+    build.add_argument("download_dir", nargs="?", default="./downloads")
+    build.add_argument("-j", "--workers", type=int, default=0, help="提取进程数，默认使用全部 CPU 核心")
+    search = commands.add_parser("search", help="全文检索（FTS5 查询语法）")
+    search.add_argument("query")
+    search.add_argument("-n", "--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with TextIndex(args.index) as index:
+        if args.command == "build":
+            started = time.perf_counter()
+            added = build_index(args.download_dir, index, args.workers)
+            print(f"新增索引 {added} 个文件，用时 {time.perf_counter() - started:.1f}s")
+        else:
+            for hit in index.search(args.query, args.limit):
+                print(f"{hit['path']}  {hit['title'] or ''}\n    {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,260 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import sys
+import os
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
 import requests
 import json
 import keyboard
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel,
                              QTextEdit, QVBoxLayout, QHBoxLayout, QSystemTrayIcon,
                              QMenu, QAction, QStyle, QLineEdit, QPushButton, QDialog, QComboBox,
-                             QScrollArea, QSizeGrip, QFrame)
+                             QScrollArea, QSizeGrip, QFrame, QCheckBox)
 from PyQt5.QtCore import Qt, QPoint, pyqtSignal, QThread, QTimer, QSize, QRect
 from PyQt5.QtGui import QIcon, QFont, QCursor, QTextCursor, QMouseEvent
 
+try:
+    from llama_cpp import Llama  # 可选：本地 CPU 推理
+except ImportError:
+    Llama = None
 
-class StreamingAPICallThread(QThread):
-    """用于在后台流式调用API的线程"""
-    result_signal = pyqtSignal(str)
-    error_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal()
+# 估算 token 数时每个 token 按 2 个 UTF-8 字节计（英文约 4 字节一个 token，中文约 2～4 字节），宁可高估
+BYTES_PER_TOKEN = 2
 
-    def __init__(self, url, method="POST", data=None, headers=None):
-        super().__init__()
+
+class BackendError(Exception):
+    """后端调用失败"""
+
+
+class StreamBackend(ABC):
+    """流式后端接口：stream() 逐段产出回复文本（delta），界面对所有后端一视同仁"""
+    name = "base"
+
+    @abstractmethod
+    def stream(self, data):
+        """逐段产出回复文本"""
+
+
+class HttpSSEBackend(StreamBackend):
+    """远程网关：HTTP + OpenAI 风格的 SSE 流"""
+    name = "remote"
+
+    def __init__(self, url, method="POST", headers=None):
         self.url = url
         self.method = method
-        self.data = data
         self.headers = headers
 
-    def run(self):
-        try:
-            # 调试信息
-            print(f"Request URL: {self.url}")
-            print(f"Request Method: {self.method}")
-            print(f"Request Headers: {self.headers}")
-            print(f"Request Data: {self.data}")
-
-            # 启用流式输出
-            if self.data and isinstance(self.data, dict):
-                self.data["stream"] = True
-
-            # 发送请求，使用流式模式
-            if self.method == "GET":
-                response = requests.get(self.url, headers=self.headers, stream=True)
-            elif self.method == "POST":
-                response = requests.post(self.url, json=self.data, headers=self.headers, stream=True)
+    def stream(self, data):
+        # 调试信息
+        print(f"Request URL: {self.url}")
+        print(f"Request Method: {self.method}")
+        print(f"Request Headers: {self.headers}")
+        print(f"Request Data: {data}")
+
+        # 启用流式输出
+        if data and isinstance(data, dict):
+            data = dict(data, stream=True)
+
+        # 发送请求，使用流式模式
+        if self.method == "GET":
+            response = requests.get(self.url, headers=self.headers, stream=True)
+        elif self.method == "POST":
+            response = requests.post(self.url, json=data, headers=self.headers, stream=True)
+        else:
+            raise ValueError(f"Unsupported HTTP method: {self.method}")
+
+        print(f"Response Status: {response.status_code}")
+
+        if response.status_code != 200:
+            raise BackendError(f"HTTP Error: {response.status_code}, Response: {response.text}")
+
+        # ✅ 关键：不要用 decode_unicode=True，我们自己控制 UTF-8 解码
+        for line in response.iter_lines():
+            if not line:
+                continue
+
+            # ✅ 手动以 UTF-8 解码原始字节
+            try:
+                line_str = line.decode('utf-8').strip()
+            except Exception as e:
+                print(f"Decode error: {e}, raw line: {line}")
+                continue
+
+            print(f"Raw line: {line_str}")  # 调试输出
+
+            if line_str.startswith("data: "):
+                json_text = line_str[6:].strip()
+            elif line_str.startswith("data:"):
+                json_text = line_str[5:].strip()
             else:
-                raise ValueError(f"Unsupported HTTP method: {self.method}")
+                continue  # 忽略其他类型
 
-            print(f"Response Status: {response.status_code}")
+            if json_text == "[DONE]":
+                print("Stream ended.")
+                break
 
-            if response.status_code != 200:
-                error_msg = f"HTTP Error: {response.status_code}, Response: {response.text}"
-                print(error_msg)
-                self.error_signal.emit(error_msg)
-                return
+            try:
+                chunk = json.loads(json_text)
+                print(f"Parsed data: {chunk}")
+
+                # 提取 content 流
+                if "choices" in chunk and len(chunk["choices"]) > 0:
+                    delta = chunk["choices"][0].get("delta", {})
+                    if "content" in delta and delta["content"] is not None:
+                        yield delta["content"]
 
-            # ✅ 关键：不要用 decode_unicode=True，我们自己控制 UTF-8 解码
-            for line in response.iter_lines():
-                if not line:
-                    continue
+            except json.JSONDecodeError as e:
+                print(f"JSON decode error: {e}, raw json text: {json_text}")
+                continue
+
+
+class ReplayCacheBackend(StreamBackend):
+    """回放缓存：按请求内容的哈希保存完整的 delta 序列，相同请求直接回放，不再访问网络"""
+    name = "cache"
+
+    def __init__(self, backend, cache_dir="./pyttt_cache"):
+        self.backend = backend
+        self.cache_dir = cache_dir
+
+    def cachePath(self, data):
+        payload = {key: value for key, value in (data or {}).items() if key != "stream"}
+        # 不同网关对同一请求的回复不同，地址也是键的一部分
+        payload["backend"] = getattr(self.backend, "url", self.backend.name)
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def stream(self, data):
+        path = self.cachePath(data)
+        if os.path.exists(path):
+            print(f"Replay from cache: {path}")
+            with open(path, encoding="utf-8") as f:
+                yield from json.load(f)
+            return
 
-                # ✅ 手动以 UTF-8 解码原始字节
+        deltas = []
+        for delta in self.backend.stream(data):
+            deltas.append(delta)
+            yield delta
+        # 只缓存完整的回复（中途出错时不会走到这里）
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(deltas, f, ensure_ascii=False)
+
+
+class LocalCPUBackend(StreamBackend):
+    """进程内后端：用 llama-cpp-python 在 CPU 线程上运行小型量化模型（GGUF）"""
+    name = "local"
+
+    def __init__(self, model_path, n_threads=None, n_ctx=2048, max_tokens=512):
+        self.model_path = model_path
+        self.n_threads = n_threads or os.cpu_count()
+        self.n_ctx = n_ctx
+        self.max_tokens = max_tokens
+        self.llm = None
+        self.load_error = None  # 加载失败的原因；失败后路由不再选择本地后端
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return Llama is not None
+
+    def fits(self, messages):
+        """估算对话的 token 数，判断加上回复（max_tokens）后能否放进上下文窗口"""
+        prompt_bytes = sum(len(message["content"].encode("utf-8")) for message in messages)
+        return prompt_bytes / BYTES_PER_TOKEN + self.max_tokens <= self.n_ctx
+
+    def load(self):
+        """加载模型（只加载一次）；启动时在后台调用，避免第一个问题等待加载"""
+        with self.lock:
+            if self.load_error:
+                raise BackendError(self.load_error)
+            if self.llm is None:
+                if Llama is None:
+                    raise BackendError("未安装 llama-cpp-python，无法使用本地模型")
+                print(f"Loading local model: {self.model_path} ({self.n_threads} threads)")
                 try:
-                    line_str = line.decode('utf-8').strip()
+                    self.llm = Llama(model_path=self.model_path, n_threads=self.n_threads,
+                                     n_ctx=self.n_ctx, verbose=False)
                 except Exception as e:
-                    print(f"Decode error: {e}, raw line: {line}")
-                    continue
+                    self.load_error = f"本地模型加载失败: {e}"
+                    raise BackendError(self.load_error) from e
+        return self.llm
+
+    def stream(self, data):
+        llm = self.load()
+        # 同一个模型实例不能并发生成
+        with self.lock:
+            for chunk in llm.create_chat_completion(messages=data["messages"], stream=True,
+                                                    max_tokens=self.max_tokens):
+                delta = chunk["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+
+class BackendRouter:
+    """路由规则：指定的模型名或较短的问题交给本地模型，其余发往远程网关"""
+
+    def __init__(self, remote, local=None, local_max_chars=200, local_models=()):
+        self.remote = remote
+        self.local = local
+        self.local_max_chars = local_max_chars
+        self.local_models = set(local_models)
+
+    def choose(self, data):
+        if self.local is None or self.local.load_error:
+            return self.remote
+        if data.get("model") in self.local_models:
+            return self.local
+        messages = data.get("messages", [])
+        question = messages[-1]["content"] if messages else ""
+        # 对话太长时本地模型的上下文放不下，也交给远程
+        if len(question) <= self.local_max_chars and self.local.fits(messages):
+            return self.local
+        return self.remote
 
-                print(f"Raw line: {line_str}")  # 调试输出
-
-                if line_str.startswith("data: "):
-                    json_text = line_str[6:].strip()
-                elif line_str.startswith("data:"):
-                    json_text = line_str[5:].strip()
-                else:
-                    continue  # 忽略其他类型
 
-                if json_text == "[DONE]":
-                    print("Stream ended.")
-                    break
+class StreamingAPICallThread(QThread):
+    """用于在后台消费流式后端的线程"""
+    result_signal = pyqtSignal(str)
+    error_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
 
-                try:
-                    data = json.loads(json_text)
-                    print(f"Parsed data: {data}")
+    def __init__(self, backend, data=None, fallback=None):
+        super().__init__()
+        self.backend = backend
+        self.data = data
+        self.fallback = fallback  # 后端在输出任何内容之前失败时改用的后端
+        self.first_token = None
 
-                    # 提取 content 流
-                    if "choices" in data and len(data["choices"]) > 0:
-                        delta = data["choices"][0].get("delta", {})
-                        if "content" in delta and delta["content"] is not None:
-                            self.result_signal.emit(delta["content"])
+    def streamFrom(self, backend, started):
+        for delta in backend.stream(self.data):
+            if self.first_token is None:
+                self.first_token = time.perf_counter() - started
+                print(f"[{backend.name}] time to first token: {self.first_token:.3f}s")
+            self.result_signal.emit(delta)
 
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}, raw json text: {json_text}")
-                    continue
+    def run(self):
+        started = time.perf_counter()
+        try:
+            try:
+                self.streamFrom(self.backend, started)
+            except BackendError as e:
+                # 例如本地模型加载失败：还没有输出内容时改用远程后端重新回答
+                if self.first_token is not None or self.fallback is None:
+                    raise
+                print(f"[{self.backend.name}] {e}, falling back to {self.fallback.name}")
+                self.backend = self.fallback
+                self.streamFrom(self.backend, started)
 
         except Exception as e:
-            error_msg = f"Error: {str(e)}"
+            error_msg = str(e) if isinstance(e, BackendError) else f"Error: {str(e)}"
             print(error_msg)
             self.error_signal.emit(error_msg)
         finally:
+            print(f"[{self.backend.name}] total: {time.perf_counter() - started:.3f}s")
             self.finished_signal.emit()
 
 
@@ -106,7 +264,7 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("设置")
-        self.setFixedSize(400, 500)
+        self.setFixedSize(400, 680)
 
         layout = QVBoxLayout()
 
@@ -133,6 +291,25 @@ class SettingsDialog(QDialog):
 
         layout.addLayout(api_group)
 
+        # 后端路由设置
+        backend_group = QVBoxLayout()
+        backend_group.addWidget(QLabel("本地模型 (GGUF 路径，留空不使用):"))
+        self.local_model_edit = QLineEdit()
+        backend_group.addWidget(self.local_model_edit)
+
+        backend_group.addWidget(QLabel("本地处理的最大问题字数:"))
+        self.local_max_chars_edit = QLineEdit()
+        backend_group.addWidget(self.local_max_chars_edit)
+
+        backend_group.addWidget(QLabel("始终使用本地模型的 model 名 (逗号分隔):"))
+        self.local_models_edit = QLineEdit()
+        backend_group.addWidget(self.local_models_edit)
+
+        self.replay_cache_check = QCheckBox("相同请求回放缓存的回复")
+        backend_group.addWidget(self.replay_cache_check)
+
+        layout.addLayout(backend_group)
+
         # 快捷键设置
         shortcut_group = QVBoxLayout()
         shortcut_group.addWidget(QLabel("快捷键:"))
@@ -213,6 +390,14 @@ class ResizableFloatingWindow(QMainWindow):
         }
         self.hotkey = "ctrl+alt+a"
 
+        # 后端路由：短问题交给本地模型，其余发往远程网关
+        self.local_model_path = ""
+        self.local_max_chars = 200
+        self.local_models = []
+        self.use_replay_cache = False
+        self.local_backend = None
+        self.buildRouter()
+
         # 对话历史
         self.conversation = []
         self.current_bot_response = ""
@@ -589,10 +774,37 @@ class ResizableFloatingWindow(QMainWindow):
             self.scroll_area.verticalScrollBar().maximum()
         )
 
+    def buildRouter(self):
+        """根据当前设置创建各个后端和路由"""
+        remote = HttpSSEBackend(self.api_url, self.method, self.headers)
+        if self.use_replay_cache:
+            remote = ReplayCacheBackend(remote)
+
+        if not self.local_model_path:
+            self.local_backend = None
+        elif not LocalCPUBackend.available():
+            print("llama-cpp-python is not installed, local backend disabled")
+            self.local_backend = None
+        elif self.local_backend is None or self.local_backend.model_path != self.local_model_path:
+            self.local_backend = LocalCPUBackend(self.local_model_path)
+            # 在后台预先加载模型，第一个问题不用等待
+            threading.Thread(target=self.preloadLocalModel, args=(self.local_backend,), daemon=True).start()
+
+        self.router = BackendRouter(remote, self.local_backend, self.local_max_chars, self.local_models)
+
+    def preloadLocalModel(self, backend):
+        try:
+            backend.load()
+        except Exception as e:
+            print(f"Failed to load local model: {e}")
+
     def callAPI(self):
         """调用API并更新显示"""
-        # 创建并启动API调用线程
-        self.api_thread = StreamingAPICallThread(self.api_url, self.method, self.data, self.headers)
+        # 按路由规则选择后端，创建并启动API调用线程
+        backend = self.router.choose(self.data)
+        print(f"Backend: {backend.name}")
+        fallback = self.router.remote if backend is not self.router.remote else None
+        self.api_thread = StreamingAPICallThread(backend, self.data, fallback)
         self.api_thread.result_signal.connect(self.updateBotResponse)
         self.api_thread.error_signal.connect(self.handleAPIError)
         self.api_thread.finished_signal.connect(self.finishResponse)
@@ -651,6 +863,11 @@ class ResizableFloatingWindow(QMainWindow):
 
         dialog.shortcut_edit.setText(self.hotkey)
 
+        dialog.local_model_edit.setText(self.local_model_path)
+        dialog.local_max_chars_edit.setText(str(self.local_max_chars))
+        dialog.local_models_edit.setText(",".join(self.local_models))
+        dialog.replay_cache_check.setChecked(self.use_replay_cache)
+
         if dialog.exec_() == QDialog.Accepted:
             # 保存设置
             self.api_url = dialog.api_url.text()
@@ -677,6 +894,16 @@ class ResizableFloatingWindow(QMainWindow):
                 print(f"Failed to parse data: {e}")
                 pass
 
+            # 后端路由设置
+            self.local_model_path = dialog.local_model_edit.text().strip()
+            try:
+                self.local_max_chars = int(dialog.local_max_chars_edit.text())
+            except ValueError as e:
+                print(f"Failed to parse max chars: {e}")
+            self.local_models = [name.strip() for name in dialog.local_models_edit.text().split(",") if name.strip()]
+            self.use_replay_cache = dialog.replay_cache_check.isChecked()
+            self.buildRouter()
+
             # 重新注册快捷键
             try:
                 keyboard.unregister_all_hotkeys()